@@ -0,0 +1,255 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the image operations
+
+Every operation is run on a fixed matrix of synthetic images, the way a
+batch runs it, and the open, transform and save phases are timed
+separately. Each case runs in its own process, so that its peak RSS can be
+measured. Results are written as JSON and can be compared with a baseline:
+
+    $ python2 benchmark.py --output baseline.json
+    $ python2 benchmark.py --output new.json --baseline baseline.json
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+from multiprocessing import Pool
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+from nautilus_image_tools import operations as imagetools
+from nautilus_image_tools.batch import run_one_piped, run_one_timed
+
+SIZES = [0.3, 2, 12, 24, 50, 100]
+FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'TIFF': '.tif'}
+MODES = ['RGB', 'RGBA', 'L', 'P']
+# Modes each format can store
+FORMAT_MODES = {'JPEG': ['RGB', 'L'],
+                'PNG': ['RGB', 'RGBA', 'L', 'P'],
+                'TIFF': ['RGB', 'RGBA', 'L', 'P']}
+# A case regresses when its fastest total grows more than THRESHOLD, and
+# also more than TIME_FLOOR seconds, or its peak RSS more than THRESHOLD
+# and RSS_FLOOR kB, so that the noise of small cases is not reported
+THRESHOLD = 0.1
+TIME_FLOOR = 0.02
+RSS_FLOOR = 8 * 1024
+# replaced by the path of a watermark in the directory of the images
+WATERMARK = 'watermark.png'
+
+# name: (operation of a file, its arguments after the file)
+OPERATIONS = {
+    'filter': (imagetools.blur_image, (False,)),
+    'enhance': (imagetools.enhance_image, (False, 120, 120, 120, 120)),
+    'vintage': (imagetools.vintage_image, (False, 20, 0)),
+    'shadow': (imagetools.shadow_image, (False,)),
+    'resize': (imagetools.resize_image, (False, False, True, True, 50, 50)),
+    'negative': (imagetools.negative_image, (False,)),
+    'greyscale': (imagetools.greyscale_image, (False,)),
+    'rotate': (imagetools.rotate_image, (False, 90)),
+    'border': (imagetools.border_image, (False,)),
+    'watermark': (imagetools.watermark_image, (False, WATERMARK, 2, 2)),
+    'flip': (imagetools.flip_image, (False, True)),
+    'black_and_white': (imagetools.black_white_image, (False,)),
+    'date': (imagetools.date_image, (False,)),
+    'convert': (imagetools.convert_image, ('.png',)),
+    'recipe': (imagetools.recipe_image,
+               (False, (('resize', (False, True, True, 50, 50)),
+                        ('enhance', (120, 120, 120, 120)),
+                        ('border', ())))),
+    }
+
+
+def get_input(directory, megapixels, aformat, mode):
+    # Synthetic images are built from the Mandelbrot set, which is
+    # deterministic and not trivial to compress
+    filename = os.path.join(directory, '%s_%s%s' % (
+        megapixels, mode, FORMATS[aformat]))
+    if not os.path.exists(filename):
+        width = int(math.sqrt(megapixels * 1000000 * 4 / 3))
+        height = int(width * 3 / 4)
+        band = Image.effect_mandelbrot((width, height),
+                                       (-2.0, -1.2, 1.0, 1.2), 100)
+        if mode == 'L':
+            image = band
+        elif mode == 'P':
+            image = band.convert('P')
+        else:
+            bands = [band, band.transpose(Image.FLIP_LEFT_RIGHT),
+                     band.transpose(Image.FLIP_TOP_BOTTOM)]
+            if mode == 'RGBA':
+                bands.append(band.point(lambda value: 255 - value / 2))
+            image = Image.merge(mode, bands)
+        image.save(filename, aformat)
+    return filename
+
+
+def get_watermark(directory):
+    filename = os.path.join(directory, WATERMARK)
+    if not os.path.exists(filename):
+        image = Image.new('RGBA', (400, 100), (255, 255, 255, 128))
+        image.save(filename)
+    return filename
+
+
+def run_case(case):
+    # Runs in its own process, so ru_maxrss is the peak of this case. The
+    # file is run as a job of a Pipeline: it comes already read, and its
+    # images are encoded in memory, so the disk does not add noise. PIL
+    # decodes lazily, so decoding counts as transform
+    operation, filename, directory, repeat = case
+    function, args = OPERATIONS[operation]
+    args = tuple(get_watermark(directory) if arg == WATERMARK else arg
+                 for arg in args)
+    with open(filename, 'rb') as fr:
+        data = fr.read()
+    result = {'open': None, 'transform': None, 'save': None}
+    totals = []
+    try:
+        for i in range(repeat):
+            (element, record), writes, compute, error = run_one_piped(
+                (run_one_timed, function, filename, args, data))
+            if 'error' in record:
+                raise Exception(record['error'])
+            totals.append(record['end'] - record['start'])
+            for phase in ('open', 'transform', 'save'):
+                if result[phase] is None or record[phase] < result[phase]:
+                    result[phase] = record[phase]
+        totals.sort()
+        result['total'] = totals[0]
+        result['median'] = totals[len(totals) / 2]
+        result['bytes_out'] = record['bytes_out']
+    except Exception as e:
+        result['error'] = str(e)
+    result['peak_rss_kb'] = resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def get_key(result):
+    return '%(operation)s %(megapixels)s MP %(format)s %(mode)s' % result
+
+
+def compare(results, baseline, threshold=THRESHOLD, time_floor=TIME_FLOOR,
+            rss_floor=RSS_FLOOR):
+    # Returns the cases whose fastest total time or peak RSS grew more than
+    # threshold over the baseline, and more than its floor
+    previous = dict((get_key(result), result)
+                    for result in baseline['results'])
+    regressions = []
+    for result in results:
+        old = previous.get(get_key(result))
+        if old is None or 'error' in result or 'error' in old:
+            continue
+        for measure, floor in (('total', time_floor),
+                               ('peak_rss_kb', rss_floor)):
+            if result[measure] > old[measure] * (1 + threshold) and \
+                    result[measure] - old[measure] > floor:
+                regressions.append((get_key(result), measure,
+                                    old[measure], result[measure]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the image tools operations')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='megapixels, comma separated')
+    parser.add_argument('--formats', default=','.join(sorted(FORMATS)))
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--operations',
+                        default=','.join(sorted(OPERATIONS)))
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='the fastest run is compared, and the median '
+                        'is also kept')
+    parser.add_argument('--directory', default=os.path.join(
+        tempfile.gettempdir(), 'image-tools-benchmark'),
+        help='where the synthetic images are kept between runs')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed slowdown, 0.1 is 10 %%')
+    parser.add_argument('--time-floor', type=float, default=TIME_FLOOR,
+                        help='smallest slowdown reported, in seconds')
+    parser.add_argument('--rss-floor', type=int, default=RSS_FLOOR,
+                        help='smallest growth of the peak RSS reported, '
+                        'in kB')
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.directory):
+        os.makedirs(args.directory)
+    results = []
+    pool = Pool(1, maxtasksperchild=1)
+    try:
+        for megapixels in [float(size) for size in args.sizes.split(',')]:
+            for aformat in args.formats.split(','):
+                for mode in args.modes.split(','):
+                    if mode not in FORMAT_MODES[aformat]:
+                        continue
+                    filename = get_input(args.directory, megapixels,
+                                         aformat, mode)
+                    for operation in args.operations.split(','):
+                        result = pool.apply(run_case, ((
+                            operation, filename, args.directory,
+                            args.repeat),))
+                        result.update({'operation': operation,
+                                       'megapixels': megapixels,
+                                       'format': aformat,
+                                       'mode': mode})
+                        results.append(result)
+                        if 'error' in result:
+                            print('%s: %s' % (get_key(result),
+                                              result['error']))
+                        else:
+                            print('%s: open %.3f s, transform %.3f s, '
+                                  'save %.3f s, total %.3f s (median %.3f '
+                                  's), peak %s kB' % (
+                                      get_key(result), result['open'],
+                                      result['transform'], result['save'],
+                                      result['total'], result['median'],
+                                      result['peak_rss_kb']))
+    finally:
+        pool.terminate()
+        pool.join()
+    with open(args.output, 'w') as output:
+        json.dump({'python': sys.version.split()[0],
+                   'pil': Image.PILLOW_VERSION,
+                   'results': results}, output, indent=1, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  args.threshold, args.time_floor,
+                                  args.rss_floor)
+        for key, measure, old, new in regressions:
+            print('REGRESSION %s %s: %s -> %s' % (key, measure, old, new))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
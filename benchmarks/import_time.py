@@ -0,0 +1,105 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Import time of the extension
+
+Nautilus loads every extension when it starts, so the time it takes to
+load nautilus-image-tools.py is paid on every start, even when no image is
+ever touched. Each measure is taken in a new interpreter:
+
+    $ python2 import_time.py
+    $ python2 import_time.py --revision HEAD~1
+
+--revision also measures the extension as it was in that git revision.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))), 'src')
+EXTENSION = 'nautilus-image-tools.py'
+SNIPPET = '''
+import imp
+import sys
+import time
+start = time.time()
+imp.load_source('nautilus_image_tools_extension', %(path)r)
+%(extra)s
+sys.stdout.write('%%f %%d' %% (time.time() - start, len(sys.modules)))
+'''
+# What the first activation of a menu item imports
+ACTIVATION = 'from nautilus_image_tools import dialogs'
+
+
+def measure(path, extra='', repeat=10):
+    # median seconds and number of modules loaded
+    times = []
+    for i in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', SNIPPET % {'path': path, 'extra': extra}],
+            cwd=os.path.dirname(path))
+        elapsed, modules = output.split()
+        times.append(float(elapsed))
+    return sorted(times)[len(times) / 2], int(modules)
+
+
+def report(label, result):
+    print('%-40s %8.1f ms %5d modules' % (label, result[0] * 1000,
+                                          result[1]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure the import time of the extension')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--revision',
+                        help='also measure the extension of this revision')
+    args = parser.parse_args(argv)
+    path = os.path.abspath(os.path.join(SRC, EXTENSION))
+    report('extension', measure(path, repeat=args.repeat))
+    report('extension and first activation',
+           measure(path, ACTIVATION, args.repeat))
+    if args.revision:
+        directory = tempfile.mkdtemp()
+        try:
+            archive = subprocess.Popen(
+                ['git', 'archive', args.revision, 'src'],
+                cwd=os.path.dirname(SRC),
+                stdout=subprocess.PIPE)
+            subprocess.check_call(['tar', '-x', '-C', directory],
+                                  stdin=archive.stdout)
+            archive.wait()
+            report('extension at %s' % args.revision,
+                   measure(os.path.join(directory, 'src', EXTENSION),
+                           repeat=args.repeat))
+        finally:
+            shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
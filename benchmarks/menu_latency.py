@@ -0,0 +1,120 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Latency of the context menu
+
+Nautilus asks the extension for its menu items on every right click and
+selection change. This times get_file_items on synthetic selections of 10
+to 100,000 files, in a session where nautilus-python is installed:
+
+    $ python2 menu_latency.py
+    $ python2 menu_latency.py --revision HEAD~1
+
+--revision also times the extension as it was in that git revision.
+"""
+
+import argparse
+import imp
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))), 'src')
+EXTENSION = 'nautilus-image-tools.py'
+SIZES = [10, 100, 1000, 10000, 100000]
+# name: (MIME type, extension) of every file of the selection
+SELECTIONS = {
+    'images': ('image/jpeg', '.jpg'),
+    'no images': ('text/plain', '.txt'),
+    'unknown types': ('application/octet-stream', '.dat'),
+}
+
+
+class FakeFile(object):
+    # What get_file_items uses of a Nautilus.FileInfo
+    def __init__(self, uri, mime_type):
+        self.uri = uri
+        self.mime_type = mime_type
+
+    def get_uri(self):
+        return self.uri
+
+    def get_mime_type(self):
+        return self.mime_type
+
+
+def get_selection(size, mime_type, extension):
+    return [FakeFile('file:///home/user/Pictures/%08d%s' % (i, extension),
+                     mime_type) for i in range(size)]
+
+
+def measure(provider, items, repeat):
+    # median seconds of a call
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        provider.get_file_items(None, items)
+        times.append(time.time() - start)
+    return sorted(times)[len(times) / 2]
+
+
+def run(label, path, repeat):
+    module = imp.load_source('extension_%s' % abs(hash(path)), path)
+    provider = module.ImageToolsMenuProvider()
+    for name in sorted(SELECTIONS):
+        for size in SIZES:
+            items = get_selection(size, *SELECTIONS[name])
+            print('%-20s %-14s %7d files %10.3f ms' % (
+                label, name, size, 1000 * measure(provider, items, repeat)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure the latency of the context menu')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--revision',
+                        help='also measure the extension of this revision')
+    args = parser.parse_args(argv)
+    run('current', os.path.join(SRC, EXTENSION), args.repeat)
+    if args.revision:
+        directory = tempfile.mkdtemp()
+        try:
+            archive = subprocess.Popen(
+                ['git', 'archive', args.revision, 'src'],
+                cwd=os.path.dirname(SRC), stdout=subprocess.PIPE)
+            subprocess.check_call(['tar', '-x', '-C', directory],
+                                  stdin=archive.stdout)
+            archive.wait()
+            sys.path.insert(0, os.path.join(directory, 'src'))
+            run(args.revision, os.path.join(directory, 'src', EXTENSION),
+                args.repeat)
+        finally:
+            shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+PIL images to GdkPixbuf and back
+
+The previews of the dialogs hand every rendered image to Gtk with
+image2pixbuf, and pixbuf2image reads pixbufs back. This checks that a
+round trip keeps every pixel, for several modes and for widths whose rows
+GdkPixbuf pads, and times both against going through a PPM file, what
+image2pixbuf used to do. It needs Gtk:
+
+    $ python2 pixbuf.py
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+from nautilus_image_tools.dialogs import image2pixbuf, pixbuf2image
+from gi.repository import GdkPixbuf
+
+MODES = ['RGB', 'RGBA', 'L', 'LA', 'P']
+# RGB rows of odd widths are padded to four bytes in a new pixbuf
+WIDTHS = [1, 2, 3, 5, 7, 255, 301]
+HEIGHT = 17
+SIZES = [(640, 480), (1920, 1080), (4000, 3000)]
+
+
+def make_image(mode, size):
+    # noise in every band, alpha included, so that no byte can be mixed up
+    # with another without changing the image
+    bands = [Image.effect_noise(size, 64) for band in range(4)]
+    return Image.merge('RGBA', bands).convert(mode)
+
+
+def get_expected(image):
+    # the image as image2pixbuf converts it
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    if 'A' in image.getbands() or 'transparency' in image.info:
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def get_padded(pixbuf):
+    # a copy of pixbuf in a pixbuf allocated by GdkPixbuf, whose rows are
+    # padded
+    width, height = pixbuf.get_width(), pixbuf.get_height()
+    padded = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB,
+                                  pixbuf.get_has_alpha(), 8, width, height)
+    pixbuf.copy_area(0, 0, width, height, padded, 0, 0)
+    return padded
+
+
+def check():
+    failed = 0
+    for mode in MODES:
+        for width in WIDTHS:
+            image = make_image(mode, (width, HEIGHT))
+            expected = get_expected(image)
+            pixbuf = image2pixbuf(image)
+            for pixbuf in (pixbuf, get_padded(pixbuf)):
+                back = pixbuf2image(pixbuf)
+                same = (back.mode == expected.mode and
+                        back.tobytes() == expected.tobytes())
+                if not same:
+                    failed += 1
+                print('%-4s %4d px, rowstride %4d: %s' % (
+                    mode, width, pixbuf.get_rowstride(),
+                    'same' if same else 'DIFFERENT'))
+    return failed
+
+
+def ppm2pixbuf(image):
+    # what image2pixbuf did before: encode a PPM file and parse it back
+    buff = io.BytesIO()
+    image.convert('RGB').save(buff, 'ppm')
+    loader = GdkPixbuf.PixbufLoader.new_with_type('pnm')
+    loader.write(buff.getvalue())
+    loader.close()
+    return loader.get_pixbuf()
+
+
+def measure(function, argument, repeat):
+    # median seconds of a call
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        function(argument)
+        times.append(time.time() - start)
+    return sorted(times)[len(times) / 2]
+
+
+def benchmark(repeat):
+    for size in SIZES:
+        image = make_image('RGB', size)
+        image.load()
+        pixbuf = image2pixbuf(image)
+        print('%5.1f MP: image2pixbuf %8.2f ms, through PPM %8.2f ms, '
+              'pixbuf2image %8.2f ms' % (
+                  size[0] * size[1] / 1000000.0,
+                  1000 * measure(image2pixbuf, image, repeat),
+                  1000 * measure(ppm2pixbuf, image, repeat),
+                  1000 * measure(pixbuf2image, pixbuf, repeat)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Check and time the PIL to GdkPixbuf conversions')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+    failed = check()
+    benchmark(args.repeat)
+    if failed > 0:
+        print('%s cases differ' % failed)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Strips against whole images
+
+Images over MEMORY_CEILING bytes are transformed in strips by the
+operations that allow it. This checks that every one of them gives the
+same pixels, and the same mode, in strips as on the whole image:
+
+    $ python2 strips.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+from nautilus_image_tools import operations
+
+SIZE = (301, 203)
+# (operation, suffix of its output, arguments after overwrite)
+CASES = [
+    (operations.negative_image, '_negative', ()),
+    (operations.vintage_image, '_vintage', (20, 1)),
+    (operations.blur_image, '_blur', ()),
+    (operations.sharpen_image, '_sharpen', ()),
+    (operations.enhance_image, '_enhance', (120, 80, 100, 150)),
+    (operations.recipe_image, '_recipe', ([('negative', ()),
+                                           ('vintage', (20, 1)),
+                                           ('blur', ())],)),
+]
+MODES = ['RGB', 'RGBA', 'L']
+
+
+def make_image(mode):
+    # a gradient with some noise, so that every filter changes it
+    image = Image.radial_gradient('L').resize(SIZE)
+    noise = Image.effect_noise(SIZE, 64)
+    image = Image.merge('RGB', (image, noise, image.transpose(
+        Image.FLIP_LEFT_RIGHT)))
+    return image.convert(mode)
+
+
+def run(function, file_in, suffix, args, ceiling):
+    operations.MEMORY_CEILING = ceiling
+    function(file_in, False, *args)
+    basename, extension = os.path.splitext(file_in)
+    file_out = basename + suffix + extension
+    image = Image.open(file_out)
+    image.load()
+    os.remove(file_out)
+    return image
+
+
+def check(directory):
+    failed = 0
+    ceiling = operations.MEMORY_CEILING
+    strip_memory = operations.STRIP_MEMORY
+    # about 8 rows by strip
+    operations.STRIP_MEMORY = SIZE[0] * 4 * 8
+    watermark = os.path.join(directory, 'watermark.png')
+    Image.new('RGBA', (40, 20), (255, 0, 0, 128)).save(watermark)
+    cases = CASES + [(operations.watermark_image, '_wartermark',
+                      (watermark, 2, 2))]
+    try:
+        for mode in MODES:
+            file_in = os.path.join(directory, 'image_%s.png' % mode)
+            make_image(mode).save(file_in)
+            for function, suffix, args in cases:
+                whole = run(function, file_in, suffix, args, ceiling)
+                strips = run(function, file_in, suffix, args, 1000)
+                same = (whole.mode == strips.mode and
+                        whole.tobytes() == strips.tobytes())
+                if not same:
+                    failed += 1
+                print('%-4s %-16s %s' % (mode, function.__name__,
+                                         'same' if same else 'DIFFERENT'))
+    finally:
+        operations.MEMORY_CEILING = ceiling
+        operations.STRIP_MEMORY = strip_memory
+    return failed
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        failed = check(directory)
+    finally:
+        shutil.rmtree(directory)
+    if failed > 0:
+        print('%s cases differ' % failed)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
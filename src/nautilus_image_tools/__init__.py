@@ -0,0 +1,42 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+APP = '$APP$'
+VERSION = '$VERSION$'
+
+_ = str
+
+NAME = 'nautilus-image-tools'
+
+# Results of the operations are kept here, by the hash of their input,
+# so that running the same operation again on the same files is free
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), NAME)
+# Journals of the batches that have not finished yet
+JOBS_DIR = os.path.join(
+    os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share')),
+    NAME, 'jobs')
+
+EXTENSIONS = ['.bmp', '.dds', '.exif', '.gif', '.jpg', '.jpeg', '.jp2',
+              '.jpx', '.pcx', '.png', '.pnm', '.ras', '.tga', '.tif',
+              '.tiff', '.xbm', '.xpm']
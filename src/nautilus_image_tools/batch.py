@@ -0,0 +1,643 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Running the operations on batches of files: worker processes, results
+# cache, journal and pipeline. Nothing here needs Gtk
+
+import os
+import glob
+import json
+import Queue
+import shutil
+import hashlib
+import tempfile
+from threading import Thread
+from threading import Condition
+from multiprocessing import Pool
+from multiprocessing import cpu_count
+import time
+from itertools import islice
+from nautilus_image_tools import operations
+from nautilus_image_tools import CACHE_DIR, JOBS_DIR, _
+from nautilus_image_tools.operations import (JOB_STATS, PIPELINED,
+                                             get_decoded_size, get_temporal,
+                                             replace_file)
+
+# Number of worker processes used to process a batch of files
+WORKERS = cpu_count()
+# Seconds between checks of the stop button while waiting for workers
+POLL_INTERVAL = 0.1
+# The results cache is trimmed to CACHE_SIZE bytes after every batch
+CACHE_SIZE = 512 * 1024 * 1024
+CACHE_META = 'meta.json'
+HASH_BLOCK = 1024 * 1024
+
+# Files a Pipeline reads ahead of the workers
+READ_AHEAD = 4
+# Jobs a Pipeline looks ahead for one that fits in the memory left
+SCHEDULE_WINDOW = 32
+# Times a file of a journal is tried before it is given up, so that a file
+# that always fails does not keep its batch waiting to be resumed
+MAX_ATTEMPTS = 2
+# Seconds a stopped Pipeline waits for the jobs in flight before it
+# terminates its workers
+STOP_TIMEOUT = 30
+
+
+def get_memory_budget():
+    # Memory the images of a batch may take at the same time: what
+    # IMAGE_TOOLS_MEMORY says, in MB, or half of the physical memory
+    if os.environ.get('IMAGE_TOOLS_MEMORY'):
+        return int(os.environ['IMAGE_TOOLS_MEMORY']) * 1024 * 1024
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 2
+    except (ValueError, OSError, AttributeError):
+        return 1024 * 1024 * 1024
+
+
+MEMORY_BUDGET = get_memory_budget()
+
+
+def run_one(job):
+    whattodo, element, args = job
+    whattodo(element, *args)
+    return element
+
+
+def run_one_safe(job):
+    # like run_one, but a failing file does not stop the batch
+    try:
+        return run_one(job), None
+    except Exception as e:
+        return job[1], e
+
+
+def run_one_timed(job):
+    # like run_one_safe, but also returns where the time went. PIL decodes
+    # the pixels lazily, on first access, so decoding counts as transform
+    JOB_STATS.clear()
+    JOB_STATS['enabled'] = True
+    # before the job, as it may overwrite the file
+    try:
+        bytes_in = os.path.getsize(job[1])
+    except OSError:
+        bytes_in = 0
+    start = time.time()
+    element, error = run_one_safe(job)
+    end = time.time()
+    JOB_STATS.pop('enabled')
+    record = {'file': element,
+              'operation': job[0].__name__,
+              'worker': os.getpid(),
+              'start': start,
+              'end': end,
+              'open': JOB_STATS.get('open', 0.0),
+              'save': JOB_STATS.get('save', 0.0),
+              'bytes_in': bytes_in,
+              'bytes_out': JOB_STATS.get('bytes_out', 0)}
+    record['transform'] = max(0.0, end - start - record['open'] -
+                              record['save'])
+    record['cached'] = JOB_STATS.get('cached', False)
+    if error is not None:
+        record['error'] = str(error)
+    return element, record
+
+
+def get_file_hash(afile):
+    sha1 = hashlib.sha1()
+    with open(afile, 'rb') as fr:
+        for block in iter(lambda: fr.read(HASH_BLOCK), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+CODE_VERSION = {}
+
+
+def get_code_version():
+    # A change in the code of the operations must not reuse old results
+    if 'hash' not in CODE_VERSION:
+        CODE_VERSION['hash'] = get_file_hash(
+            os.path.splitext(os.path.abspath(operations.__file__))[0] + '.py')
+    return CODE_VERSION['hash']
+
+
+def normalize_parameter(parameter):
+    # 50 from the dialogs and 50.0 from the command line are the same, and
+    # a watermark file that changed is not
+    if isinstance(parameter, bool) or parameter is None:
+        return parameter
+    if isinstance(parameter, (int, long, float)):
+        return float(parameter)
+    if isinstance(parameter, (list, tuple)):
+        return [normalize_parameter(item) for item in parameter]
+    if isinstance(parameter, basestring) and os.path.isfile(parameter):
+        return [parameter, os.path.getmtime(parameter),
+                os.path.getsize(parameter)]
+    return parameter
+
+
+def get_cache_key(file_in, whattodo, args):
+    sha1 = hashlib.sha1()
+    sha1.update(json.dumps([get_file_hash(file_in), whattodo.__name__,
+                            normalize_parameter(args),
+                            get_code_version()]))
+    return sha1.hexdigest()
+
+
+def copy_file(file_in, file_out):
+    temporal = get_temporal(file_out)
+    try:
+        shutil.copyfile(file_in, temporal)
+        replace_file(temporal, file_out)
+    except Exception:
+        os.remove(temporal)
+        raise
+
+
+class CachedOperation(object):
+    # Wraps an *_image function to reuse its outputs when it was already
+    # run on a file with the same content and the same parameters. The
+    # outputs are kept in a directory of cache_dir named by the key,
+    # with a meta.json listing where they go relative to the input
+    def __init__(self, whattodo, cache_dir=CACHE_DIR):
+        self.whattodo = whattodo
+        self.cache_dir = cache_dir
+        self.__name__ = whattodo.__name__
+
+    def __call__(self, file_in, *args):
+        key = get_cache_key(file_in, self.whattodo, args)
+        entry = os.path.join(self.cache_dir, key)
+        meta = os.path.join(entry, CACHE_META)
+        directory = os.path.dirname(os.path.abspath(file_in))
+        if os.path.exists(meta):
+            with open(meta) as fr:
+                outputs = json.load(fr)
+            for index, (name, file_hash) in enumerate(outputs):
+                file_out = os.path.join(directory, name)
+                if not os.path.exists(file_out) or \
+                        get_file_hash(file_out) != file_hash:
+                    copy_file(os.path.join(entry, str(index)), file_out)
+            # the modification time of meta.json orders the evictions
+            os.utime(meta, None)
+            JOB_STATS['cached'] = True
+            return
+        JOB_STATS['outputs'] = []
+        try:
+            self.whattodo(file_in, *args)
+            written = JOB_STATS['outputs']
+        finally:
+            JOB_STATS.pop('outputs')
+        temporal = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            outputs = []
+            # in a Pipeline the outputs are still in memory
+            pending = dict(PIPELINED.get('writes', ()))
+            for index, file_out in enumerate(written):
+                blob = os.path.join(temporal, str(index))
+                if file_out in pending:
+                    with open(blob, 'wb') as fw:
+                        fw.write(pending[file_out])
+                    file_hash = hashlib.sha1(pending[file_out]).hexdigest()
+                else:
+                    shutil.copyfile(file_out, blob)
+                    file_hash = get_file_hash(file_out)
+                outputs.append((os.path.relpath(file_out, directory),
+                                file_hash))
+            with open(os.path.join(temporal, CACHE_META), 'w') as fw:
+                json.dump(outputs, fw)
+            os.rename(temporal, entry)
+        except OSError:
+            # another worker stored the same result first
+            shutil.rmtree(temporal, ignore_errors=True)
+
+
+def trim_cache(cache_dir=CACHE_DIR, size=CACHE_SIZE):
+    # Removes the least recently used results until the cache fits in size
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        meta = os.path.join(entry, CACHE_META)
+        if not os.path.exists(meta):
+            continue
+        entry_size = sum(os.path.getsize(os.path.join(entry, afile))
+                         for afile in os.listdir(entry))
+        entries.append((os.path.getmtime(meta), entry_size, entry))
+        total += entry_size
+    for used, entry_size, entry in sorted(entries):
+        if total <= size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= entry_size
+
+
+class Journal(object):
+    # Record on disk of a batch, to resume it after a crash or a stop. The
+    # first line describes the batch and each of the others is a file
+    # already done, or an object with a file that failed and its error.
+    # Every line is synced to disk before the next file
+    # counts as done, and a line cut by a crash is ignored
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        with open(path) as fr:
+            lines = fr.read().split('\n')
+        header = json.loads(lines[0])
+        self.operation = header['operation']
+        self.args = tuple(header['args'])
+        self.elements = header['elements']
+        self.done = set()
+        # times every file failed
+        self.failures = {}
+        # the last item is empty or the line cut by a crash
+        for line in lines[1:-1]:
+            entry = json.loads(line)
+            if isinstance(entry, dict):
+                self.failures[entry['file']] = self.failures.get(
+                    entry['file'], 0) + 1
+            else:
+                self.done.add(entry)
+
+    @classmethod
+    def create(cls, whattodo, args, elements, jobs_dir=JOBS_DIR):
+        if not os.path.exists(jobs_dir):
+            os.makedirs(jobs_dir)
+        header = json.dumps({'operation': whattodo.__name__,
+                             'args': args,
+                             'elements': elements})
+        fd, temporal = tempfile.mkstemp(suffix='.tmp', dir=jobs_dir)
+        with os.fdopen(fd, 'w') as fw:
+            fw.write(header + '\n')
+            fw.flush()
+            os.fsync(fw.fileno())
+        path = os.path.splitext(temporal)[0] + '.journal'
+        os.rename(temporal, path)
+        return cls(path)
+
+    def get_function(self):
+        return getattr(operations, self.operation)
+
+    def get_pending(self):
+        # files removed since the batch started, or that failed too many
+        # times, are not waited for
+        return [element for element in self.elements
+                if element not in self.done and os.path.exists(element) and
+                self.failures.get(element, 0) < MAX_ATTEMPTS]
+
+    def add(self, element, error=None):
+        # records element as done, or as failed with error
+        if error is None:
+            entry = element
+        else:
+            entry = {'file': element, 'error': str(error)}
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if error is None:
+            self.done.add(element)
+        else:
+            self.failures[element] = self.failures.get(element, 0) + 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        self.close()
+        os.remove(self.path)
+
+
+def discard_journals(jobs_dir=JOBS_DIR):
+    # Removes the journals of the batches that did not finish, that will
+    # not be resumed. Returns how many
+    paths = glob.glob(os.path.join(jobs_dir, '*.journal'))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
+
+
+def get_journals(jobs_dir=JOBS_DIR):
+    journals = []
+    for path in sorted(glob.glob(os.path.join(jobs_dir, '*.journal'))):
+        try:
+            journals.append(Journal(path))
+        except (IOError, ValueError, KeyError) as e:
+            print('%s: %s' % (path, e))
+    return journals
+
+
+def read_file(afile):
+    # a single read of the whole file is sequential, and the kernel reads
+    # ahead of it
+    with open(afile, 'rb') as fr:
+        return fr.read()
+
+
+def get_error(result):
+    # the error of a result of run_one_safe or run_one_timed, if any
+    if isinstance(result, tuple):
+        if isinstance(result[1], dict):
+            return result[1].get('error')
+        return result[1]
+    return None
+
+
+def get_bomb_error(header, budget=MEMORY_BUDGET):
+    # Images that would not fit in the memory budget once decoded, even
+    # alone, are rejected from their header, before they are decoded
+    decoded = get_decoded_size(header)
+    if decoded > budget:
+        return _('the image takes %.0f MB decoded, over the memory budget '
+                 'of %.0f MB') % (decoded / 1048576.0, budget / 1048576.0)
+    return None
+
+
+def run_one_piped(job):
+    # Compute stage of a Pipeline, in a worker process. The file comes
+    # already read, and the images are encoded in memory for the write
+    # stage. Errors are returned, as the pool can not report them to a
+    # callback
+    worker, whattodo, element, args, data = job
+    PIPELINED.update({'file': element, 'data': data, 'writes': []})
+    start = time.time()
+    try:
+        result = worker((whattodo, element, args))
+        return result, PIPELINED['writes'], time.time() - start, None
+    except Exception as e:
+        return element, [], time.time() - start, e
+    finally:
+        PIPELINED.clear()
+
+
+class Pipeline(object):
+    # Runs jobs in three stages, so that the disks and the processors work
+    # at the same time. A thread reads the next files, a pool of processes
+    # decodes, transforms and encodes them in memory, and another thread
+    # writes the results. The files read but not written yet are bounded
+    # by workers + read_ahead, and the results waiting to be written by
+    # read_ahead. worker is run_one, run_one_safe or run_one_timed.
+    # footprints is the memory each file takes while it is processed, by
+    # file. The files in flight are also bounded to budget bytes, except
+    # a file that is over it by itself, which runs alone. jobs can also be
+    # an iterator, of jobs that are known while the batch runs
+    def __init__(self, worker, jobs, workers=WORKERS, read_ahead=READ_AHEAD,
+                 footprints=None, budget=MEMORY_BUDGET):
+        self.worker = worker
+        self.jobs = jobs
+        if hasattr(jobs, '__len__'):
+            workers = min(workers, len(jobs))
+        self.workers = max(1, workers)
+        self.limit = self.workers + read_ahead
+        # footprints may still be filled while the batch runs
+        if footprints is None:
+            footprints = {}
+        self.footprints = footprints
+        self.budget = budget
+        self.in_flight = 0
+        # jobs sent to the pool, and whether there are no more to send
+        self.submitted = 0
+        self.read_done = False
+        self.in_memory = 0
+        self.in_memory_max = 0
+        self.slots = Condition()
+        self.write_queue = Queue.Queue(read_ahead)
+        self.done_queue = Queue.Queue()
+        # stopit stops handing out jobs, and closing stops the threads once
+        # the jobs in flight are done
+        self.stopit = False
+        self.closing = False
+        self.start = None
+        self.busy = {'read': 0.0, 'compute': 0.0, 'write': 0.0}
+        # sum and maximum of the depths seen by the write stage
+        self.depths = {'in_flight': [0, 0], 'write_queue': [0, 0]}
+        self.written = 0
+
+    def stop(self, *args):
+        self.stopit = True
+
+    def get_next(self, window):
+        # Index in window of the first job that fits in the memory left,
+        # taking the first one when nothing else is in flight
+        if self.in_flight >= self.limit:
+            return None
+        if self.in_flight == 0:
+            return 0
+        for index, job in enumerate(window):
+            footprint = self.footprints.get(job[1], 0)
+            if self.in_memory + footprint <= self.budget:
+                return index
+        return None
+
+    def read(self):
+        try:
+            self.read_jobs()
+        finally:
+            self.read_done = True
+
+    def read_jobs(self):
+        jobs = iter(self.jobs)
+        window = []
+        while True:
+            window.extend(islice(jobs, SCHEDULE_WINDOW - len(window)))
+            if len(window) == 0:
+                return
+            with self.slots:
+                index = self.get_next(window)
+                while index is None and not self.stopit:
+                    self.slots.wait(POLL_INTERVAL)
+                    index = self.get_next(window)
+                if self.stopit:
+                    return
+                job = window.pop(index)
+                footprint = self.footprints.get(job[1], 0)
+                self.in_flight += 1
+                self.submitted += 1
+                self.in_memory += footprint
+                self.in_memory_max = max(self.in_memory_max, self.in_memory)
+            start = time.time()
+            try:
+                data = read_file(job[1])
+            except (IOError, OSError):
+                # the worker opens the file itself and reports the error
+                data = None
+            self.busy['read'] += time.time() - start
+            try:
+                self.pool.apply_async(
+                    run_one_piped, ((self.worker,) + tuple(job) + (data,),),
+                    callback=lambda item, footprint=footprint: self.computed(
+                        item + (footprint,)))
+            except ValueError:
+                # the pool was terminated
+                return
+
+    def computed(self, item):
+        # called in the thread of the pool that collects the results
+        while not self.closing:
+            try:
+                self.write_queue.put(item, True, POLL_INTERVAL)
+                return
+            except Queue.Full:
+                pass
+
+    def write(self):
+        while not self.closing:
+            try:
+                item = self.write_queue.get(True, POLL_INTERVAL)
+            except Queue.Empty:
+                continue
+            result, writes, compute, error, footprint = item
+            self.busy['compute'] += compute
+            for name, value in (('in_flight', self.in_flight),
+                                ('write_queue', self.write_queue.qsize())):
+                self.depths[name][0] += value
+                self.depths[name][1] = max(self.depths[name][1], value)
+            start = time.time()
+            try:
+                if error is None and get_error(result) is None:
+                    for file_out, data in writes:
+                        temporal = get_temporal(file_out)
+                        try:
+                            with open(temporal, 'wb') as fw:
+                                fw.write(data)
+                            replace_file(temporal, file_out)
+                        except Exception:
+                            os.remove(temporal)
+                            raise
+            except Exception as e:
+                error = e
+            elapsed = time.time() - start
+            self.busy['write'] += elapsed
+            if isinstance(result, tuple) and isinstance(result[1], dict):
+                result[1]['write'] = elapsed
+            self.written += 1
+            with self.slots:
+                self.in_flight -= 1
+                self.in_memory -= footprint
+                self.slots.notify()
+            self.done_queue.put((result, error))
+
+    def results(self):
+        # Yields the results of the worker as their files are written. When
+        # it is stopped, or a job fails, no more jobs are started, but the
+        # ones in flight are still written and yielded, and then the error
+        # is raised
+        self.start = time.time()
+        self.pool = Pool(self.workers)
+        threads = [Thread(target=self.read), Thread(target=self.write)]
+        first_error = None
+        stopped = None
+        try:
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            done = 0
+            while not (self.read_done and done == self.submitted):
+                if self.stopit and stopped is None:
+                    stopped = time.time()
+                if stopped is not None and \
+                        time.time() - stopped > STOP_TIMEOUT:
+                    break
+                try:
+                    result, error = self.done_queue.get(True, POLL_INTERVAL)
+                except Queue.Empty:
+                    continue
+                done += 1
+                if error is not None:
+                    if first_error is None:
+                        first_error = error
+                    self.stop()
+                    continue
+                yield result
+        finally:
+            self.shutdown(threads)
+        if first_error is not None:
+            raise first_error
+
+    def shutdown(self, threads):
+        # Terminating the pool while workers send their results back can
+        # hang it, so the jobs in flight are let finish first, and the pool
+        # is only terminated when they take longer than STOP_TIMEOUT
+        self.stopit = True
+        deadline = time.time() + STOP_TIMEOUT
+        while not (self.read_done and self.in_flight == 0) and \
+                time.time() < deadline:
+            time.sleep(POLL_INTERVAL)
+        self.closing = True
+        for thread in threads:
+            thread.join()
+        if self.in_flight == 0:
+            self.pool.close()
+        else:
+            self.pool.terminate()
+        self.pool.join()
+
+    def get_stats(self):
+        # utilisation of each stage, 1.0 is always busy, and queue depths
+        elapsed = max(time.time() - self.start, 1e-6)
+        written = max(self.written, 1)
+        return {'read': self.busy['read'] / elapsed,
+                'compute': self.busy['compute'] / elapsed / self.workers,
+                'write': self.busy['write'] / elapsed,
+                'in_flight': float(self.depths['in_flight'][0]) / written,
+                'in_flight_max': self.depths['in_flight'][1],
+                'write_queue': float(self.depths['write_queue'][0]) / written,
+                'write_queue_max': self.depths['write_queue'][1],
+                'memory_max': self.in_memory_max}
+
+
+def format_pipeline_stats(stats):
+    return _('read %.0f %%, compute %.0f %%, write %.0f %% busy; '
+             '%.1f files in flight (max %s), %.1f waiting to be written '
+             '(max %s), %.0f MB of images at most') % (
+        100 * stats['read'], 100 * stats['compute'], 100 * stats['write'],
+        stats['in_flight'], stats['in_flight_max'], stats['write_queue'],
+        stats['write_queue_max'], stats.get('memory_max', 0) / 1048576.0)
+
+
+def export_trace(timing_log, trace_file):
+    # Converts a timing log into a Chrome trace-event file, that can be
+    # loaded in chrome://tracing to see the batch on a timeline with one
+    # row per worker
+    events = []
+    with open(timing_log) as log:
+        for line in log:
+            record = json.loads(line)
+            start = record['start']
+            for phase in ('open', 'transform', 'save', 'write'):
+                if phase not in record:
+                    continue
+                events.append({'name': phase,
+                               'cat': record['operation'],
+                               'ph': 'X',
+                               'pid': 0,
+                               'tid': record['worker'],
+                               'ts': int(start * 1000000),
+                               'dur': int(record[phase] * 1000000),
+                               'args': {'file': record['file'],
+                                        'bytes_in': record['bytes_in'],
+                                        'bytes_out': record['bytes_out']}})
+                start += record[phase]
+    with open(trace_file, 'w') as trace:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace)
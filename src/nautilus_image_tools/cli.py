@@ -0,0 +1,311 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Command line interface, it does not need Gtk nor Nautilus
+
+import os
+import glob
+import argparse
+import json
+import tempfile
+import time
+from nautilus_image_tools import operations
+from nautilus_image_tools import CACHE_DIR, EXTENSIONS, _
+from nautilus_image_tools.operations import (FILTERS, OPERATIONS,
+                                             RESIZE_QUALITIES,
+                                             black_white_image, border_image,
+                                             convert_image, date_image,
+                                             enhance_image, flip_image,
+                                             get_footprint,
+                                             greyscale_image, negative_image,
+                                             recipe_image, resize_image,
+                                             rotate_image,
+                                             shadow_image, vintage_image,
+                                             watermark_image)
+from nautilus_image_tools.batch import (CachedOperation, Journal,
+                                        MEMORY_BUDGET, Pipeline, WORKERS,
+                                        discard_journals, export_trace,
+                                        format_pipeline_stats,
+                                        get_bomb_error, get_journals,
+                                        run_one_safe, run_one_timed,
+                                        trim_cache)
+from nautilus_image_tools.probe import ProbeIndex
+
+
+def get_cli_files(paths, recursive=False):
+    # Arguments can be files, directories or globs that the shell did not
+    # expand. Only files with an image extension are kept
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for root, dirnames, filenames in os.walk(path):
+                    files.extend(os.path.join(root, filename)
+                                 for filename in sorted(filenames))
+            else:
+                files.extend(os.path.join(path, filename)
+                             for filename in sorted(os.listdir(path)))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            files.extend(sorted(glob.glob(path)))
+    return [afile for afile in files
+            if os.path.splitext(afile)[1].lower() in EXTENSIONS and
+            os.path.isfile(afile)]
+
+
+def get_recipe_step(text):
+    # A step of a recipe, NAME or NAME=ARGUMENTS, where ARGUMENTS is the
+    # JSON list of the arguments the step takes after the image
+    name, equal, arguments = text.partition('=')
+    name = name.replace('-', '_')
+    if name not in OPERATIONS and name not in FILTERS:
+        raise argparse.ArgumentTypeError(_('unknown step %s') % name)
+    try:
+        arguments = json.loads(arguments) if equal else []
+    except ValueError as e:
+        raise argparse.ArgumentTypeError('%s: %s' % (text, e))
+    if not isinstance(arguments, list):
+        raise argparse.ArgumentTypeError(
+            _('%s: the arguments must be a JSON list') % text)
+    return name, tuple(arguments)
+
+
+def get_cli_parser():
+    parser = argparse.ArgumentParser(
+        description=_('Apply the image tools operations to files'))
+    parser.add_argument('-j', '--jobs', type=int, default=WORKERS,
+                        help=_('number of worker processes'))
+    parser.add_argument('-o', '--overwrite', action='store_true',
+                        help=_('overwrite the original files'))
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help=_('look for images in subdirectories'))
+    parser.add_argument('--timing-log',
+                        help=_('append the timings of every file to this '
+                               'JSON lines file'))
+    parser.add_argument('--trace',
+                        help=_('write the timings as a Chrome trace-event '
+                               'file'))
+    parser.add_argument('--cache', action='store_true',
+                        help=_('reuse the results of files already '
+                               'processed with the same options'))
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--memory', type=int,
+                        default=MEMORY_BUDGET / 1024 / 1024,
+                        help=_('MB the images being processed may take at '
+                               'the same time (default: %(default)s)'))
+    subparsers = parser.add_subparsers(dest='operation')
+    subparser = subparsers.add_parser(
+        'resume', help=_('resume the batches that did not finish'))
+    subparser.add_argument('--discard', action='store_true',
+                           help=_('remove the batches that did not finish, '
+                                  'without resuming them'))
+    subparser.set_defaults(function=None)
+
+    def add_operation(name, function, options=lambda args: ()):
+        subparser = subparsers.add_parser(name)
+        subparser.add_argument('files', nargs='+',
+                               help=_('files, directories or globs'))
+        subparser.set_defaults(function=function, options=options)
+        return subparser
+
+    subparser = add_operation(
+        'resize', resize_image,
+        lambda args: (args.keep_aspect_ratio, not args.pixels,
+                      not args.pixels, args.width, args.height,
+                      RESIZE_QUALITIES[args.quality]))
+    subparser.add_argument('--width', type=float, default=50)
+    subparser.add_argument('--height', type=float, default=50)
+    subparser.add_argument('--pixels', action='store_true',
+                           help=_('width and height are pixels, not %%'))
+    subparser.add_argument('--keep-aspect-ratio', action='store_true')
+    subparser.add_argument('--quality', choices=sorted(RESIZE_QUALITIES),
+                           default='balanced')
+    subparser = add_operation('rotate', rotate_image,
+                              lambda args: (args.degrees,))
+    subparser.add_argument('--degrees', type=float, default=90,
+                           help=_('counterclockwise'))
+    subparser = add_operation('flip', flip_image,
+                              lambda args: (not args.vertical,))
+    subparser.add_argument('--vertical', action='store_true')
+    subparser = add_operation(
+        'enhance', enhance_image,
+        lambda args: (args.brightness, args.color, args.contrast,
+                      args.sharpness))
+    for option in ('--brightness', '--color', '--contrast', '--sharpness'):
+        subparser.add_argument(option, type=float, default=100)
+    subparser = add_operation('vintage', vintage_image,
+                              lambda args: (args.noise, args.seed))
+    subparser.add_argument('--noise', type=int, default=20)
+    subparser.add_argument('--seed', type=int)
+    subparser = add_operation(
+        'watermark', watermark_image,
+        lambda args: (args.watermark,
+                      ['left', 'center', 'right'].index(args.horizontal),
+                      ['top', 'middle', 'bottom'].index(args.vertical)))
+    subparser.add_argument('--watermark', required=True)
+    subparser.add_argument('--horizontal', default='left',
+                           choices=['left', 'center', 'right'])
+    subparser.add_argument('--vertical', default='top',
+                           choices=['top', 'middle', 'bottom'])
+    subparser = add_operation('border', border_image,
+                              lambda args: (args.width, args.fill))
+    subparser.add_argument('--width', type=int, default=-1)
+    subparser.add_argument('--fill', default='white')
+    subparser = add_operation('shadow', shadow_image,
+                              lambda args: (args.iterations, args.border))
+    subparser.add_argument('--iterations', type=int, default=8)
+    subparser.add_argument('--border', type=int, default=-1)
+    subparser = add_operation('convert', convert_image,
+                              lambda args: (args.to,))
+    subparser.add_argument('--to', required=True,
+                           choices=[extension[1:] for extension in EXTENSIONS])
+    subparser = add_operation('recipe', recipe_image,
+                              lambda args: (args.step,))
+    subparser.add_argument('--step', type=get_recipe_step, action='append',
+                           required=True,
+                           help=_('NAME or NAME=ARGUMENTS, a JSON list, '
+                                  'applied in order, e.g. negative or '
+                                  'resize=[true, true, true, 50, 50]'))
+    add_operation('black-and-white', black_white_image)
+    add_operation('date', date_image)
+    add_operation('greyscale', greyscale_image)
+    add_operation('negative', negative_image)
+    for name in sorted(FILTERS):
+        add_operation(name.replace('_', '-'),
+                      getattr(operations, name + '_image'))
+    return parser
+
+
+def main(argv=None):
+    args = get_cli_parser().parse_args(argv)
+    if args.function is None and args.discard:
+        print(_('%s batches discarded') % discard_journals())
+        return 0
+    if args.function is None:
+        errors = 0
+        for journal in get_journals():
+            pending = journal.get_pending()
+            if len(pending) == 0:
+                journal.remove()
+                continue
+            errors += run_batch(args, journal.get_function(), pending,
+                                journal.args, journal)
+    else:
+        files = get_cli_files(args.files, args.recursive)
+        if args.function is convert_image:
+            options = args.options(args)
+        else:
+            options = (args.overwrite,) + args.options(args)
+        errors = run_batch(args, args.function, files, options,
+                           Journal.create(args.function, options, files))
+    if errors > 0:
+        print(_('%s files failed') % errors)
+        return 1
+    return 0
+
+
+def run_batch(args, function, files, options, journal):
+    # Returns the number of files that failed. The journal is removed when
+    # none is pending, and kept to retry the ones that failed with resume
+    # otherwise, up to MAX_ATTEMPTS times. The files that can not be
+    # processed, or would not fit in memory, are reported before the batch
+    # starts, and recorded as done as retrying them would fail again
+    budget = args.memory * 1024 * 1024
+    index = ProbeIndex()
+    try:
+        headers = index.probe(files, max(1, args.jobs))
+    finally:
+        index.save()
+    errors = 0
+    files = []
+    size = 0
+    footprints = {}
+    for header in headers:
+        error = header['error'] or get_bomb_error(header, budget)
+        if error is not None:
+            errors += 1
+            print('%s: %s' % (header['file'], error))
+            journal.add(header['file'])
+        else:
+            files.append(header['file'])
+            size += header['size']
+            footprints[header['file']] = get_footprint(function, options,
+                                                       header)
+    if args.cache:
+        if not os.path.exists(args.cache_dir):
+            os.makedirs(args.cache_dir)
+        function = CachedOperation(function, args.cache_dir)
+    jobs = [(function, afile, options) for afile in files]
+    start = time.time()
+    hits = 0
+    timing_log = args.timing_log
+    if args.trace and not timing_log:
+        fd, timing_log = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+    log = None
+    if timing_log or args.cache:
+        worker = run_one_timed
+    else:
+        worker = run_one_safe
+    pipeline = Pipeline(worker, jobs, max(1, args.jobs),
+                        footprints=footprints, budget=budget)
+    try:
+        if timing_log:
+            log = open(timing_log, 'a')
+        if timing_log or args.cache:
+            for afile, record in pipeline.results():
+                if log is not None:
+                    log.write(json.dumps(record) + '\n')
+                if record['cached']:
+                    hits += 1
+                if 'error' in record:
+                    errors += 1
+                    print('%s: %s' % (afile, record['error']))
+                journal.add(afile, record.get('error'))
+        else:
+            for afile, error in pipeline.results():
+                if error is not None:
+                    errors += 1
+                    print('%s: %s' % (afile, error))
+                journal.add(afile, error)
+    finally:
+        if log is not None:
+            log.close()
+        if len(journal.get_pending()) == 0:
+            journal.remove()
+        else:
+            journal.close()
+    if args.trace:
+        export_trace(timing_log, args.trace)
+        if not args.timing_log:
+            os.remove(timing_log)
+    elapsed = max(time.time() - start, 1e-6)
+    print(_('%s files (%.1f MB) in %.2f s: %.2f files/s, %.2f MB/s') % (
+        len(files), size / 1048576.0, elapsed, len(files) / elapsed,
+        size / 1048576.0 / elapsed))
+    if len(jobs) > 0:
+        print(format_pipeline_stats(pipeline.get_stats()))
+    if args.cache:
+        trim_cache(args.cache_dir)
+        print(_('%s of %s files from the cache (%.0f %%)') % (
+            hits, len(files), 100.0 * hits / max(len(files), 1)))
+    return errors
@@ -0,0 +1,1992 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Dialogs, progress of the batches and the actions of the menu items.
+# This module is only imported when a menu item is activated
+
+import gi
+try:
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('GdkPixbuf', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import Gtk
+from gi.repository import GdkPixbuf
+from gi.repository import GObject
+from gi.repository import GLib
+import os
+import json
+import Queue
+from collections import deque
+from threading import Thread
+from threading import Condition
+from PIL import Image
+import time
+from nautilus_image_tools import APP, CACHE_DIR, EXTENSIONS, NAME, VERSION, _
+from nautilus_image_tools.operations import (RESIZE_BALANCED, RESIZE_BEST,
+                                             RESIZE_FAST, black_white_image,
+                                             blur_image, border_image,
+                                             contour_image, convert_image,
+                                             enhance, enhance_image,
+                                             flip_image, get_footprint,
+                                             get_work,
+                                             greyscale_image, negative_image,
+                                             recipe_image, resize_image,
+                                             rotate_image, shadow_image,
+                                             vintage, vintage_image, watermark,
+                                             watermark_image)
+from nautilus_image_tools.batch import (CachedOperation, Journal,
+                                        MEMORY_BUDGET, POLL_INTERVAL,
+                                        Pipeline, WORKERS,
+                                        discard_journals,
+                                        format_pipeline_stats,
+                                        get_bomb_error, get_journals,
+                                        run_one_safe, run_one_timed,
+                                        trim_cache)
+from nautilus_image_tools.probe import ProbeIndex, probe_image
+
+# number of files the throughput shown while processing is averaged over
+THROUGHPUT_WINDOW = 20
+# files that can not be processed listed at the end of a batch
+BAD_FILES_SHOWN = 20
+
+RECIPE_STEPS = [('black_and_white', _('Black and white')),
+                ('blur', _('Blur')),
+                ('border', _('Border')),
+                ('contour', _('Contour')),
+                ('enhance', _('Enhance')),
+                ('flip', _('Flip')),
+                ('greyscale', _('Greyscale')),
+                ('negative', _('Negative')),
+                ('resize', _('Resize')),
+                ('rotate', _('Rotate')),
+                ('shadow', _('Shadow')),
+                ('sharpen', _('Sharpen')),
+                ('vintage', _('Vintage')),
+                ('watermark', _('Watermark'))]
+
+
+class IdleObject(GObject.GObject):
+    """
+    Override GObject.GObject to always emit signals in the main thread
+    by emmitting on an idle handler
+    """
+    def __init__(self):
+        GObject.GObject.__init__(self)
+
+    def emit(self, *args):
+        GLib.idle_add(GObject.GObject.emit, self, *args)
+
+
+class DoItInBackground(IdleObject, Thread):
+    __gsignals__ = {
+        'started': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, (int,)),
+        'estimated': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE,
+                      (float, int)),
+        'ended': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, (bool,)),
+        'start_one': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, (str,)),
+        'end_one': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, (float,)),
+        'timed_one': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE,
+                      (object,)),
+        'cached': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, (int, int)),
+        'pipeline': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, (object,)),
+    }
+
+    def __init__(self, elements, whattodo, *args, **kwargs):
+        IdleObject.__init__(self)
+        Thread.__init__(self)
+        self.elements = elements
+        self.whattodo = whattodo
+        self.args = args
+        self.workers = kwargs.get('workers', WORKERS)
+        # when set, the timings of every file are appended to this file,
+        # one JSON object per line, and sent with the timed_one signal
+        self.timing_log = kwargs.get('timing_log')
+        # directory of the results cache, or None to always run whattodo
+        self.cache_dir = kwargs.get('cache_dir')
+        # Journal where every file done is recorded, or None
+        self.journal = kwargs.get('journal')
+        # bytes the images being processed may take at the same time
+        self.memory_budget = kwargs.get('memory_budget', MEMORY_BUDGET)
+        self.pipeline = None
+        self.hits = 0
+        # estimated work and memory of every file, filled by check before
+        # the batch
+        self.works = {}
+        self.footprints = {}
+        # headers of the files left out of the batch, as they would fail,
+        # filled by check while the batch runs
+        self.bad_files = []
+        self.stopit = False
+        self.ok = False
+        self.daemon = True
+
+    def stop(self, *args):
+        self.stopit = True
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def check(self, accepted):
+        # Reads the headers of the files in parallel, ahead of the files
+        # being processed, to estimate the work and the memory, and to
+        # leave out the files that can not be processed or would not fit
+        # in memory. The others are put in accepted as they are probed,
+        # then None. Sends the work of the files probed so far every
+        # POLL_INTERVAL
+        index = ProbeIndex()
+        count = 0
+        work = 0.0
+        last = time.time()
+        try:
+            for probed, header in enumerate(
+                    index.iter_probe(self.elements, self.workers)):
+                if self.stopit is True:
+                    return
+                error = header['error'] or get_bomb_error(
+                    header, self.memory_budget)
+                if error is not None:
+                    print('%s: %s' % (header['file'], error))
+                    self.bad_files.append(dict(header, error=error))
+                    continue
+                element = header['file']
+                self.works[element] = get_work(element, self.whattodo,
+                                               self.args, header)
+                work += self.works[element]
+                self.footprints[element] = get_footprint(self.whattodo,
+                                                         self.args, header)
+                count += 1
+                accepted.put(element)
+                if time.time() - last > POLL_INTERVAL:
+                    self.emit('estimated', work, probed + 1)
+                    last = time.time()
+            self.emit('started', count)
+            self.emit('estimated', work, count)
+        finally:
+            index.save()
+            accepted.put(None)
+
+    def get_jobs(self, whattodo):
+        # The jobs of the files accepted by check, as it probes them
+        accepted = Queue.Queue()
+        prober = Thread(target=self.check, args=(accepted,))
+        prober.daemon = True
+        prober.start()
+        while True:
+            element = accepted.get()
+            if element is None:
+                return
+            yield whattodo, element, self.args
+
+    def results(self):
+        whattodo = self.whattodo
+        if self.cache_dir:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            whattodo = CachedOperation(whattodo, self.cache_dir)
+        jobs = self.get_jobs(whattodo)
+        # both workers return the file with its record or error, so that
+        # run records a failure in the journal
+        if self.timing_log or self.cache_dir:
+            worker = run_one_timed
+        else:
+            worker = run_one_safe
+        if self.workers < 2 or len(self.elements) < 2:
+            for job in jobs:
+                if self.stopit is True:
+                    return
+                self.emit('start_one', job[1])
+                yield worker(job)
+        else:
+            # Each file is processed in its own worker process, so the
+            # batch is not bound to a single core by the GIL, while other
+            # files are read and written
+            self.pipeline = Pipeline(worker, jobs,
+                                     min(self.workers, len(self.elements)),
+                                     footprints=self.footprints,
+                                     budget=self.memory_budget)
+            # when stopped, the files already in flight are still yielded,
+            # so that run records them in the journal
+            for result in self.pipeline.results():
+                self.emit('start_one', result[0])
+                yield result
+            stats = self.pipeline.get_stats()
+            print(format_pipeline_stats(stats))
+            self.emit('pipeline', stats)
+
+    def run(self):
+        self.emit('started', len(self.elements))
+        log = None
+        try:
+            self.ok = True
+            if self.timing_log:
+                log = open(self.timing_log, 'a')
+            # every file yielded has been written, so it is recorded in
+            # the journal even after a stop or an error, or resume would
+            # process it again
+            for element, record in self.results():
+                if isinstance(record, dict):
+                    error = record.get('error')
+                else:
+                    error = record
+                if error is not None:
+                    # The batch stops at the first file that fails, but the
+                    # files in flight are still finished. The failure is
+                    # recorded, so that resume gives up on the file after
+                    # MAX_ATTEMPTS tries
+                    print('%s: %s' % (element, error))
+                    if self.journal is not None:
+                        self.journal.add(element, error)
+                    self.stop()
+                    continue
+                if isinstance(record, dict):
+                    if record['cached']:
+                        self.hits += 1
+                    if log is not None:
+                        log.write(json.dumps(record) + '\n')
+                        log.flush()
+                    self.emit('timed_one', record)
+                if self.journal is not None:
+                    self.journal.add(element)
+                self.emit('end_one', self.works.get(element, 0.0))
+            if self.stopit is True:
+                self.ok = False
+        except Exception as e:
+            print(e)
+            self.ok = False
+        finally:
+            if log is not None:
+                log.close()
+            if self.journal is not None:
+                # an unfinished batch keeps its journal to be resumed,
+                # without the files left out, that would fail again
+                if self.ok or len(self.journal.get_pending()) == 0:
+                    self.journal.remove()
+                else:
+                    for header in list(self.bad_files):
+                        self.journal.add(header['file'])
+                    self.journal.close()
+        if self.cache_dir:
+            trim_cache(self.cache_dir)
+            count = len(self.elements) - len(self.bad_files)
+            print(_('%s of %s files from the cache') % (self.hits, count))
+            self.emit('cached', self.hits, count)
+        self.emit('ended', self.ok)
+
+
+class Progreso(Gtk.Dialog, IdleObject):
+    __gsignals__ = {
+        'i-want-stop': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, ()),
+    }
+
+    def __init__(self, title, parent):
+        Gtk.Dialog.__init__(self, title, parent,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT)
+        IdleObject.__init__(self)
+        self.set_position(Gtk.WindowPosition.CENTER_ALWAYS)
+        self.set_size_request(330, 30)
+        self.set_resizable(False)
+        self.connect('destroy', self.close)
+        self.set_modal(True)
+        vbox = Gtk.VBox(spacing=5)
+        vbox.set_border_width(5)
+        self.get_content_area().add(vbox)
+        #
+        frame1 = Gtk.Frame()
+        vbox.pack_start(frame1, True, True, 0)
+        table = Gtk.Table(3, 2, False)
+        frame1.add(table)
+        #
+        self.label = Gtk.Label()
+        table.attach(self.label, 0, 2, 0, 1,
+                     xpadding=5,
+                     ypadding=5,
+                     xoptions=Gtk.AttachOptions.SHRINK,
+                     yoptions=Gtk.AttachOptions.EXPAND)
+        #
+        self.progressbar = Gtk.ProgressBar()
+        self.progressbar.set_size_request(300, 0)
+        table.attach(self.progressbar, 0, 1, 1, 2,
+                     xpadding=5,
+                     ypadding=5,
+                     xoptions=Gtk.AttachOptions.SHRINK,
+                     yoptions=Gtk.AttachOptions.EXPAND)
+        button_stop = Gtk.Button()
+        button_stop.set_size_request(40, 40)
+        button_stop.set_image(
+            Gtk.Image.new_from_stock(Gtk.STOCK_STOP, Gtk.IconSize.BUTTON))
+        button_stop.connect('clicked', self.on_button_stop_clicked)
+        table.attach(button_stop, 1, 2, 1, 2,
+                     xpadding=5,
+                     ypadding=5,
+                     xoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.label_eta = Gtk.Label()
+        table.attach(self.label_eta, 0, 2, 2, 3,
+                     xpadding=5,
+                     ypadding=5,
+                     xoptions=Gtk.AttachOptions.SHRINK,
+                     yoptions=Gtk.AttachOptions.EXPAND)
+        self.stop = False
+        self.show_all()
+        self.value = 0.0
+        self.done = 0
+        self.count = 0
+        self.estimate = None
+        # (time, work) of the last files, for the moving average
+        self.samples = deque([(time.time(), 0.0)],
+                             maxlen=THROUGHPUT_WINDOW + 1)
+
+    def set_max_value(self, anobject, count):
+        self.count = count
+
+    def set_estimate(self, anobject, work, probed):
+        # files not probed yet are supposed to be like the average
+        if probed > 0:
+            self.estimate = work * self.count / probed
+
+    def get_stop(self):
+        return self.stop
+
+    def on_button_stop_clicked(self, widget):
+        self.stop = True
+        self.emit('i-want-stop')
+
+    def close(self, *args):
+        self.destroy()
+
+    def increase(self, anobject, value):
+        self.value += float(value)
+        self.done += 1
+        self.samples.append((time.time(), float(value)))
+        if self.estimate:
+            fraction = min(1.0, self.value / self.estimate)
+        else:
+            fraction = float(self.done) / max(self.count, 1)
+        self.progressbar.set_fraction(fraction)
+        elapsed = self.samples[-1][0] - self.samples[0][0]
+        files = len(self.samples) - 1
+        text = _('%s of %s files') % (self.done, self.count)
+        if elapsed > 0:
+            text += _(', %.1f files/s') % (files / elapsed)
+            throughput = sum(work for when, work in
+                             list(self.samples)[1:]) / elapsed
+            if self.estimate and throughput > 0:
+                text += _(', %s left') % format_duration(
+                    max(0.0, self.estimate - self.value) / throughput)
+        self.label_eta.set_text(text)
+        if self.done >= self.count:
+            self.hide()
+
+    def set_element(self, anobject, element):
+        self.label.set_text(_('Sending: %s') % element)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours > 0:
+        return '%d:%02d:%02d' % (hours, minutes, seconds)
+    return '%d:%02d' % (minutes, seconds)
+
+
+def process_files(title, window, files, whattodo, *args, **kwargs):
+    kwargs.setdefault('timing_log', os.environ.get('IMAGE_TOOLS_TIMING_LOG'))
+    # like --cache, the cache is only used when asked for, as it hashes
+    # every file and keeps a second copy of every output
+    if os.environ.get('IMAGE_TOOLS_CACHE'):
+        kwargs.setdefault('cache_dir', CACHE_DIR)
+    if 'journal' not in kwargs:
+        try:
+            kwargs['journal'] = Journal.create(whattodo, args, files)
+        except (TypeError, ValueError, OSError, IOError) as e:
+            # the batch still runs, but it can not be resumed
+            print(e)
+    diib = DoItInBackground(files, whattodo, *args, **kwargs)
+    progreso = Progreso(title, window)
+    diib.connect('started', progreso.set_max_value)
+    diib.connect('estimated', progreso.set_estimate)
+    diib.connect('start_one', progreso.set_element)
+    diib.connect('end_one', progreso.increase)
+    diib.connect('ended', progreso.close)
+    progreso.connect('i-want-stop', diib.stop)
+    diib.start()
+    progreso.run()
+    if len(diib.bad_files) > 0:
+        show_bad_files(window, diib.bad_files)
+
+
+def show_bad_files(window, headers):
+    md = Gtk.MessageDialog(window, 0, Gtk.MessageType.WARNING,
+                           Gtk.ButtonsType.CLOSE,
+                           _('%s files were left out') % len(headers))
+    md.format_secondary_text('\n'.join(
+        '%s: %s' % (os.path.basename(header['file']), header['error'])
+        for header in headers[:BAD_FILES_SHOWN]))
+    md.run()
+    md.destroy()
+
+
+def get_size(files):
+    # size of the first file that can be processed, from its header
+    for afile in files:
+        header = probe_image(afile)
+        if header['error'] is None:
+            return header['width'], header['height']
+    return None
+
+
+class PreviewRenderer(IdleObject, Thread):
+    """
+    Render the previews of a dialog out of the main thread. Only the last
+    requested parameters are rendered: every request gets a generation
+    number, and requests or results superseded by a newer one are dropped
+    """
+    __gsignals__ = {
+        'rendered': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE,
+                     (int, object)),
+    }
+
+    def __init__(self, render):
+        IdleObject.__init__(self)
+        Thread.__init__(self)
+        self.render = render
+        self.condition = Condition()
+        self.request = None
+        self.generation = 0
+        self.stopit = False
+        self.daemon = True
+
+    def request_render(self, *args):
+        with self.condition:
+            self.generation += 1
+            self.request = (self.generation, args)
+            self.condition.notify()
+        return self.generation
+
+    def stop(self, *args):
+        with self.condition:
+            self.stopit = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.request is None and self.stopit is False:
+                    self.condition.wait()
+                if self.stopit is True:
+                    return
+                generation, args = self.request
+                self.request = None
+            try:
+                image = self.render(*args)
+                if generation == self.generation:
+                    self.emit('rendered', generation, image2pixbuf(image))
+            except Exception as e:
+                print(e)
+
+
+class WatermarkDialog(Gtk.Dialog):
+    def __init__(self, image_filename=None):
+        Gtk.Dialog.__init__(
+            self,
+            _('Watermark'),
+            None,
+            Gtk.DialogFlags.MODAL | Gtk.DialogFlags.DESTROY_WITH_PARENT,
+            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_size_request(500, 140)
+        self.set_resizable(False)
+        self.set_icon_name(NAME.lower())
+        self.connect('destroy', self.close_application)
+        #
+        vbox0 = Gtk.VBox(spacing=5)
+        vbox0.set_border_width(5)
+        self.get_content_area().add(vbox0)
+        #
+        notebook = Gtk.Notebook()
+        vbox0.add(notebook)
+        #
+        frame = Gtk.Frame()
+        notebook.append_page(frame, tab_label=Gtk.Label(_('Water mark')))
+        #
+        table = Gtk.Table(rows=4, columns=2, homogeneous=False)
+        table.set_border_width(5)
+        table.set_col_spacings(5)
+        table.set_row_spacings(5)
+        frame.add(table)
+        #
+        frame1 = Gtk.Frame()
+        table.attach(frame1, 0, 1, 0, 1,
+                     xoptions=Gtk.AttachOptions.EXPAND,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.scrolledwindow1 = Gtk.ScrolledWindow()
+        self.scrolledwindow1.set_size_request(400, 400)
+        self.scrolledwindow1.connect('key-release-event',
+                                     self.on_key_release_event)
+        frame1.add(self.scrolledwindow1)
+        #
+        viewport1 = Gtk.Viewport()
+        viewport1.set_size_request(400, 400)
+        self.scrolledwindow1.add(viewport1)
+        #
+        frame2 = Gtk.Frame()
+        table.attach(frame2, 1, 2, 0, 1,
+                     xoptions=Gtk.AttachOptions.EXPAND,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        scrolledwindow2 = Gtk.ScrolledWindow()
+        scrolledwindow2.set_size_request(400, 400)
+        self.connect('key-release-event', self.on_key_release_event)
+        frame2.add(scrolledwindow2)
+        #
+        viewport2 = Gtk.Viewport()
+        viewport2.set_size_request(400, 400)
+        scrolledwindow2.add(viewport2)
+        #
+        self.scale = 100
+        #
+        vertical_options = Gtk.ListStore(str, int)
+        vertical_options.append([_('Top'), 0])
+        vertical_options.append([_('Middle'), 1])
+        vertical_options.append([_('Bottom'), 2])
+        #
+        horizontal_options = Gtk.ListStore(str, int)
+        horizontal_options.append([_('Left'), 0])
+        horizontal_options.append([_('Center'), 1])
+        horizontal_options.append([_('Right'), 2])
+        #
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table.attach(self.rbutton0, 0, 2, 1, 2,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        vbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        table.attach(vbox, 0, 2, 2, 3,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        label = Gtk.Label(_('Watermark') + ':')
+        vbox.pack_start(label, False, False, 0)
+        self.entry = Gtk.Entry()
+        self.entry.set_width_chars(50)
+        self.entry.set_sensitive(False)
+        vbox.pack_start(self.entry, True, True, 0)
+        button = Gtk.Button(_('Choose File'))
+        button.connect('clicked', self.on_button_clicked)
+        vbox.pack_start(button, False, False, 0)
+        #
+        label = Gtk.Label(_('Horizontal position') + ':')
+        table.attach(label, 0, 1, 3, 4,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.horizontal = Gtk.ComboBox.new_with_model_and_entry(
+            horizontal_options)
+        self.horizontal.set_entry_text_column(0)
+        self.horizontal.set_active(0)
+        self.horizontal.connect('changed', self.on_value_changed)
+        table.attach(self.horizontal, 1, 2, 3, 4,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        label = Gtk.Label(_('Vertical position') + ':')
+        table.attach(label, 0, 1, 4, 5,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.vertical = Gtk.ComboBox.new_with_model_and_entry(vertical_options)
+        self.vertical.set_entry_text_column(0)
+        self.vertical.set_active(0)
+        self.vertical.connect('changed', self.on_value_changed)
+        table.attach(self.vertical, 1, 2, 4, 5,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.pixbuf1 = None
+        self.pixbuf2 = None
+        self.image1 = None
+        self.image2 = None
+        self.pil_image1 = None
+        self.pil_image2 = None
+        self.proxy = None
+        self.proxy_scale = None
+        self.renderer = PreviewRenderer(self.render_preview)
+        self.renderer.connect('rendered', self.on_preview_rendered)
+        self.renderer.start()
+        if image_filename is not None:
+            self.pil_image1 = Image.open(image_filename)
+            if self.pil_image1.mode != 'RGB':
+                self.pil_image1 = self.pil_image1.convert('RGB')
+            # the file is decoded once, by PIL, for both previews
+            self.pixbuf1 = image2pixbuf(self.pil_image1)
+            self.pixbuf2 = self.pixbuf1
+            self.image1 = Gtk.Image.new_from_pixbuf(self.pixbuf1)
+            viewport1.add(self.image1)
+            self.image2 = Gtk.Image.new_from_pixbuf(self.pixbuf2)
+            viewport2.add(self.image2)
+        self.show_all()
+        if image_filename is not None:
+            factor_w = float(
+                self.scrolledwindow1.get_allocation().width) / float(
+                self.pixbuf1.get_width())
+            factor_h = float(
+                self.scrolledwindow1.get_allocation().height) / float(
+                self.pixbuf1.get_height())
+            if factor_w < factor_h:
+                factor = factor_w
+            else:
+                factor = factor_h
+            self.scale = int(factor * 100)
+            w = int(self.pixbuf1.get_width() * factor)
+            h = int(self.pixbuf1.get_height() * factor)
+            #
+            self.image1.set_from_pixbuf(
+                self.pixbuf1.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(
+                self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+
+    def on_value_changed(self, widget):
+        self.update_watermark()
+
+    def get_horizontal_option(self):
+        tree_iter = self.horizontal.get_active_iter()
+        if tree_iter is not None:
+            model = self.horizontal.get_model()
+            return model[tree_iter][1]
+        return 0
+
+    def get_vertical_option(self):
+        tree_iter = self.vertical.get_active_iter()
+        if tree_iter is not None:
+            model = self.vertical.get_model()
+            return model[tree_iter][1]
+        return 0
+
+    def update_preview_cb(self, file_chooser, preview):
+        filename = file_chooser.get_preview_filename()
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(filename, 128, 128)
+            preview.set_from_pixbuf(pixbuf)
+            have_preview = True
+        except Exception as e:
+            print(e)
+            have_preview = False
+        file_chooser.set_preview_widget_active(have_preview)
+        return
+
+    def on_button_clicked(self, button):
+        dialog = Gtk.FileChooserDialog(
+            _('Please choose a file'),
+            self,
+            Gtk.FileChooserAction.OPEN,
+            (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+             Gtk.STOCK_OPEN, Gtk.ResponseType.OK))
+        dialog.set_default_response(Gtk.ResponseType.OK)
+        dialog.set_select_multiple(False)
+        dialog.set_current_folder(os.getenv('HOME'))
+        filter_png = Gtk.FileFilter()
+        filter_png.set_name(_('Png files'))
+        filter_png.add_mime_type('image/png')
+        dialog.add_filter(filter_png)
+        preview = Gtk.Image()
+        dialog.set_preview_widget(preview)
+        dialog.connect('update-preview', self.update_preview_cb, preview)
+        response = dialog.run()
+        if response == Gtk.ResponseType.OK:
+            self.entry.set_text(dialog.get_filename())
+        dialog.destroy()
+        self.update_watermark()
+
+    def get_options(self):
+        return (self.entry.get_text(), self.get_horizontal_option(),
+                self.get_vertical_option())
+
+    def render_preview(self, scale, options):
+        return watermark(self.get_proxy(scale), *options,
+                         scale=min(scale / 100.0, 1.0))
+
+    def update_watermark(self):
+        file_watermark = self.entry.get_text()
+        if file_watermark and os.path.exists(file_watermark):
+            self.renderer.request_render(self.scale, self.get_options())
+
+    def get_proxy(self, scale):
+        if self.proxy is None or self.proxy_scale != scale:
+            self.proxy = make_proxy(self.pil_image1, scale)
+            self.proxy_scale = scale
+        return self.proxy
+
+    def on_preview_rendered(self, renderer, generation, pixbuf):
+        if generation != renderer.generation:
+            return
+        self.pixbuf2 = pixbuf
+        w = int(self.pixbuf1.get_width() * self.scale / 100)
+        h = int(self.pixbuf1.get_height() * self.scale / 100)
+        self.image2.set_from_pixbuf(
+            self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+
+    def on_key_release_event(self, widget, event):
+        print((event.keyval))
+        scale = self.scale
+        if event.keyval == 65451 or event.keyval == 43:
+            self.scale = self.scale * 1.1
+        elif event.keyval == 65453 or event.keyval == 45:
+            self.scale = self.scale * .9
+        elif event.keyval == 65456 or event.keyval == 48:
+            factor_w = float(
+                self.scrolledwindow1.get_allocation().width) / float(
+                self.pixbuf1.get_width())
+            factor_h = float(
+                self.scrolledwindow1.get_allocation().height) / float(
+                self.pixbuf1.get_height())
+            if factor_w < factor_h:
+                factor = factor_w
+            else:
+                factor = factor_h
+            self.scale = int(factor * 100)
+            w = int(self.pixbuf1.get_width() * factor)
+            h = int(self.pixbuf1.get_height() * factor)
+            #
+            self.image1.set_from_pixbuf(
+                self.pixbuf1.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(
+                self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+        elif event.keyval == 65457 or event.keyval == 49:
+            self.scale = 100
+        if self.image1:
+            w = int(self.pixbuf1.get_width() * self.scale / 100)
+            h = int(self.pixbuf1.get_height() * self.scale / 100)
+            #
+            self.image1.set_from_pixbuf(
+                self.pixbuf1.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(
+                self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+        if self.image1 and self.scale != scale:
+            self.update_watermark()
+
+    def close_application(self, widget):
+        self.renderer.stop()
+        self.hide()
+
+
+class ConvertDialog(Gtk.Dialog):
+    def __init__(self, window):
+        Gtk.Dialog.__init__(self,
+                            _('Convert to'),
+                            window,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_size_request(300, 140)
+        self.set_resizable(False)
+        self.set_icon_name(NAME.lower())
+        self.connect('destroy', self.close_application)
+        #
+        vbox0 = Gtk.VBox(spacing=5)
+        vbox0.set_border_width(5)
+        self.get_content_area().add(vbox0)
+        #
+        notebook = Gtk.Notebook()
+        vbox0.add(notebook)
+        #
+        frame1 = Gtk.Frame()
+        notebook.append_page(frame1, tab_label=Gtk.Label(_('Convert to')))
+        #
+        table1 = Gtk.Table(rows=1, columns=2, homogeneous=False)
+        table1.set_border_width(5)
+        table1.set_col_spacings(5)
+        table1.set_row_spacings(5)
+        frame1.add(table1)
+        #
+        options = Gtk.ListStore(str)
+        for extension in EXTENSIONS:
+            options.append([extension[1:]])
+        label = Gtk.Label(_('Convert to') + ':')
+        table1.attach(label, 0, 1, 0, 1,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.convert_to = Gtk.ComboBox.new_with_model_and_entry(options)
+        self.convert_to.set_entry_text_column(0)
+        self.convert_to.set_active(0)
+        table1.attach(self.convert_to, 1, 2, 0, 1,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.show_all()
+
+    def get_convert_to(self):
+        tree_iter = self.convert_to.get_active_iter()
+        if tree_iter is not None:
+            model = self.convert_to.get_model()
+            return model[tree_iter][0]
+        return 'png'
+
+    def close_application(self, widget):
+        self.hide()
+
+
+class EnhanceDialog(Gtk.Dialog):
+    def __init__(self, title, window, image_filename=None):
+        Gtk.Dialog.__init__(self, title, window,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_default_size(800, 400)
+        self.set_resizable(True)
+        self.connect('destroy', self.close)
+        #
+        vbox = Gtk.VBox(spacing=5)
+        vbox.set_border_width(5)
+        self.get_content_area().add(vbox)
+        #
+        frame = Gtk.Frame()
+        vbox.pack_start(frame, True, True, 0)
+        #
+        table = Gtk.Table(rows=2, columns=3, homogeneous=False)
+        table.set_border_width(5)
+        table.set_col_spacings(5)
+        table.set_row_spacings(5)
+        frame.add(table)
+        #
+        frame1 = Gtk.Frame()
+        table.attach(frame1, 0, 1, 0, 1,
+                     xoptions=Gtk.AttachOptions.EXPAND,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.scrolledwindow1 = Gtk.ScrolledWindow()
+        self.scrolledwindow1.set_size_request(400, 400)
+        self.connect('key-release-event', self.on_key_release_event)
+        frame1.add(self.scrolledwindow1)
+        #
+        viewport1 = Gtk.Viewport()
+        viewport1.set_size_request(400, 400)
+        self.scrolledwindow1.add(viewport1)
+        #
+        frame2 = Gtk.Frame()
+        table.attach(frame2, 1, 2, 0, 1,
+                     xoptions=Gtk.AttachOptions.EXPAND,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        scrolledwindow2 = Gtk.ScrolledWindow()
+        scrolledwindow2.set_size_request(400, 400)
+        self.connect('key-release-event', self.on_key_release_event)
+        frame2.add(scrolledwindow2)
+        #
+        viewport2 = Gtk.Viewport()
+        viewport2.set_size_request(400, 400)
+        scrolledwindow2.add(viewport2)
+        #
+        self.scale = 100
+        #
+        #
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table.attach(self.rbutton0, 0, 2, 1, 2,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        table.attach(Gtk.Label(_('Brightness')), 0, 1, 2, 3,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.slider1 = Gtk.HScale()
+        self.slider1.set_digits(0)
+        self.slider1.set_name('scale1')
+        self.slider1.set_adjustment(Gtk.Adjustment(100, 0, 200, 1, 10, 0))
+        self.slider1.connect("value-changed", self.slider_on_value_changed)
+        table.attach(self.slider1, 1, 2, 2, 3,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        table.attach(Gtk.Label(_('Color')), 0, 1, 3, 4,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.slider2 = Gtk.HScale()
+        self.slider2.set_digits(0)
+        self.slider2.set_name('scale2')
+        self.slider2.set_adjustment(Gtk.Adjustment(100, 0, 200, 1, 10, 0))
+        self.slider2.connect("value-changed", self.slider_on_value_changed)
+        table.attach(self.slider2, 1, 2, 3, 4,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        table.attach(Gtk.Label(_('Contrast')), 0, 1, 4, 5,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.slider3 = Gtk.HScale()
+        self.slider3.set_digits(0)
+        self.slider3.set_name('scale3')
+        self.slider3.set_adjustment(Gtk.Adjustment(100, 0, 200, 1, 10, 0))
+        self.slider3.connect("value-changed", self.slider_on_value_changed)
+        table.attach(self.slider3, 1, 2, 4, 5,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        table.attach(Gtk.Label(_('Sharpness')), 0, 1, 5, 6,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.slider4 = Gtk.HScale()
+        self.slider4.set_digits(0)
+        self.slider4.set_name('scale4')
+        self.slider4.set_adjustment(Gtk.Adjustment(100, 0, 200, 1, 10, 0))
+        self.slider4.connect("value-changed", self.slider_on_value_changed)
+        table.attach(self.slider4, 1, 2, 5, 6,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.pixbuf1 = None
+        self.pixbuf2 = None
+        self.image1 = None
+        self.image2 = None
+        self.pil_image1 = None
+        self.pil_image2 = None
+        self.proxy = None
+        self.proxy_scale = None
+        self.renderer = PreviewRenderer(self.render_preview)
+        self.renderer.connect('rendered', self.on_preview_rendered)
+        self.renderer.start()
+        if image_filename is not None:
+            self.pil_image1 = Image.open(image_filename)
+            # the file is decoded once, by PIL, for both previews
+            self.pixbuf1 = image2pixbuf(self.pil_image1)
+            self.pixbuf2 = self.pixbuf1
+            self.image1 = Gtk.Image.new_from_pixbuf(self.pixbuf1)
+            viewport1.add(self.image1)
+            self.image2 = Gtk.Image.new_from_pixbuf(self.pixbuf2)
+            viewport2.add(self.image2)
+        self.show_all()
+        if image_filename is not None:
+            factor_w = (float(self.scrolledwindow1.get_allocation().width) /
+                        float(self.pixbuf1.get_width()))
+            factor_h = (float(self.scrolledwindow1.get_allocation().height) /
+                        float(self.pixbuf1.get_height()))
+            if factor_w < factor_h:
+                factor = factor_w
+            else:
+                factor = factor_h
+            self.scale = int(factor * 100)
+            w = int(self.pixbuf1.get_width() * factor)
+            h = int(self.pixbuf1.get_height() * factor)
+            #
+            self.image1.set_from_pixbuf(
+                self.pixbuf1.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(
+                self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+
+    def get_options(self):
+        return (self.slider1.get_value(), self.slider2.get_value(),
+                self.slider3.get_value(), self.slider4.get_value())
+
+    def render_preview(self, scale, options):
+        return enhance(self.get_proxy(scale), *options)
+
+    def slider_on_value_changed(self, widget):
+        self.renderer.request_render(self.scale, self.get_options())
+
+    def get_proxy(self, scale):
+        if self.proxy is None or self.proxy_scale != scale:
+            self.proxy = make_proxy(self.pil_image1, scale)
+            self.proxy_scale = scale
+        return self.proxy
+
+    def on_preview_rendered(self, renderer, generation, pixbuf):
+        if generation != renderer.generation:
+            return
+        self.pixbuf2 = pixbuf
+        w = int(self.pixbuf1.get_width() * self.scale / 100)
+        h = int(self.pixbuf1.get_height() * self.scale / 100)
+        self.image2.set_from_pixbuf(
+            self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+
+    def on_key_release_event(self, widget, event):
+        print((event.keyval))
+        scale = self.scale
+        if event.keyval == 65451 or event.keyval == 43:
+            self.scale = self.scale * 1.1
+        elif event.keyval == 65453 or event.keyval == 45:
+            self.scale = self.scale * .9
+        elif event.keyval == 65456 or event.keyval == 48:
+            factor_w = (float(self.scrolledwindow1.get_allocation().width) /
+                        float(self.pixbuf1.get_width()))
+            factor_h = (float(self.scrolledwindow1.get_allocation().height) /
+                        float(self.pixbuf1.get_height()))
+            if factor_w < factor_h:
+                factor = factor_w
+            else:
+                factor = factor_h
+            self.scale = int(factor * 100)
+            w = int(self.pixbuf1.get_width() * factor)
+            h = int(self.pixbuf1.get_height() * factor)
+            #
+            self.image1.set_from_pixbuf(
+                self.pixbuf1.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(
+                self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+        elif event.keyval == 65457 or event.keyval == 49:
+            self.scale = 100
+        if self.image1:
+            w = int(self.pixbuf1.get_width() * self.scale / 100)
+            h = int(self.pixbuf1.get_height() * self.scale / 100)
+            #
+            self.image1.set_from_pixbuf(
+                self.pixbuf1.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(
+                self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+        if self.image1 and self.scale != scale:
+            self.slider_on_value_changed(None)
+
+    def close(self, widget):
+        self.renderer.stop()
+        self.destroy()
+
+
+class VintageDialog(Gtk.Dialog):
+    def __init__(self, title, image_filename=None):
+        Gtk.Dialog.__init__(self, title, None,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_default_size(800, 400)
+        self.set_resizable(True)
+        self.connect('destroy', self.close)
+        #
+        vbox = Gtk.VBox(spacing=5)
+        vbox.set_border_width(5)
+        self.get_content_area().add(vbox)
+        #
+        frame = Gtk.Frame()
+        vbox.pack_start(frame, True, True, 0)
+        #
+        table = Gtk.Table(rows=2, columns=3, homogeneous=False)
+        table.set_border_width(5)
+        table.set_col_spacings(5)
+        table.set_row_spacings(5)
+        frame.add(table)
+        #
+        frame1 = Gtk.Frame()
+        table.attach(frame1, 0, 1, 0, 1,
+                     xoptions=Gtk.AttachOptions.EXPAND,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.scrolledwindow1 = Gtk.ScrolledWindow()
+        self.scrolledwindow1.set_size_request(400, 400)
+        self.scrolledwindow1.connect('key-release-event',
+                                     self.on_key_release_event)
+        frame1.add(self.scrolledwindow1)
+        #
+        viewport1 = Gtk.Viewport()
+        viewport1.set_size_request(400, 400)
+        self.scrolledwindow1.add(viewport1)
+        #
+        frame2 = Gtk.Frame()
+        table.attach(frame2, 1, 2, 0, 1,
+                     xoptions=Gtk.AttachOptions.EXPAND,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        scrolledwindow2 = Gtk.ScrolledWindow()
+        scrolledwindow2.set_size_request(400, 400)
+        self.connect('key-release-event', self.on_key_release_event)
+        frame2.add(scrolledwindow2)
+        #
+        viewport2 = Gtk.Viewport()
+        viewport2.set_size_request(400, 400)
+        scrolledwindow2.add(viewport2)
+        #
+        self.scale = 100
+        #
+        #
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table.attach(self.rbutton0, 0, 2, 1, 2,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        table.attach(Gtk.Label(_('Noise')), 0, 1, 2, 3,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        self.slider1 = Gtk.HScale()
+        self.slider1.set_digits(0)
+        self.slider1.set_name('scale1')
+        self.slider1.set_adjustment(Gtk.Adjustment(0, 0, 100, 1, 10, 0))
+        self.slider1.connect("value-changed", self.slider_on_value_changed)
+        table.attach(self.slider1, 1, 2, 2, 3,
+                     xoptions=Gtk.AttachOptions.FILL,
+                     yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.pixbuf1 = None
+        self.pixbuf2 = None
+        self.image1 = None
+        self.image2 = None
+        self.pil_image1 = None
+        self.pil_image2 = None
+        self.proxy = None
+        self.proxy_scale = None
+        self.renderer = PreviewRenderer(self.render_preview)
+        self.renderer.connect('rendered', self.on_preview_rendered)
+        self.renderer.start()
+        if image_filename is not None:
+            self.pil_image1 = Image.open(image_filename)
+            if self.pil_image1.mode != 'RGB':
+                self.pil_image1 = self.pil_image1.convert('RGB')
+            # the file is decoded once, by PIL, for both previews
+            self.pixbuf1 = image2pixbuf(self.pil_image1)
+            self.pixbuf2 = self.pixbuf1
+            self.image1 = Gtk.Image.new_from_pixbuf(self.pixbuf1)
+            viewport1.add(self.image1)
+            self.image2 = Gtk.Image.new_from_pixbuf(self.pixbuf2)
+            viewport2.add(self.image2)
+        self.show_all()
+        if image_filename is not None:
+            factor_w = (float(self.scrolledwindow1.get_allocation().width) /
+                        float(self.pixbuf1.get_width()))
+            factor_h = (float(self.scrolledwindow1.get_allocation().height) /
+                        float(self.pixbuf1.get_height()))
+            if factor_w < factor_h:
+                factor = factor_w
+            else:
+                factor = factor_h
+            self.scale = int(factor * 100)
+            w = int(self.pixbuf1.get_width() * factor)
+            h = int(self.pixbuf1.get_height() * factor)
+            #
+            self.image1.set_from_pixbuf(self.pixbuf1.scale_simple(
+                w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(self.pixbuf2.scale_simple(
+                w, h, GdkPixbuf.InterpType.BILINEAR))
+            # the first preview is rendered once the image fits the window
+            self.slider1.set_value(20)
+
+    def get_options(self):
+        return (int(self.slider1.get_value()),)
+
+    def render_preview(self, scale, options):
+        return vintage(self.get_proxy(scale), *options)
+
+    def slider_on_value_changed(self, widget):
+        self.renderer.request_render(self.scale, self.get_options())
+
+    def get_proxy(self, scale):
+        if self.proxy is None or self.proxy_scale != scale:
+            self.proxy = make_proxy(self.pil_image1, scale)
+            self.proxy_scale = scale
+        return self.proxy
+
+    def on_preview_rendered(self, renderer, generation, pixbuf):
+        if generation != renderer.generation:
+            return
+        self.pixbuf2 = pixbuf
+        w = int(self.pixbuf1.get_width() * self.scale / 100)
+        h = int(self.pixbuf1.get_height() * self.scale / 100)
+        self.image2.set_from_pixbuf(
+            self.pixbuf2.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR))
+
+    def on_key_release_event(self, widget, event):
+        print((event.keyval))
+        scale = self.scale
+        if event.keyval == 65451 or event.keyval == 43:
+            self.scale = self.scale*1.1
+        elif event.keyval == 65453 or event.keyval == 45:
+            self.scale = self.scale*.9
+        elif event.keyval == 65456 or event.keyval == 48:
+            factor_w = (float(self.scrolledwindow1.get_allocation().width) /
+                        float(self.pixbuf1.get_width()))
+            factor_h = (float(self.scrolledwindow1.get_allocation().height) /
+                        float(self.pixbuf1.get_height()))
+            if factor_w < factor_h:
+                factor = factor_w
+            else:
+                factor = factor_h
+            self.scale = int(factor*100)
+            w = int(self.pixbuf1.get_width()*factor)
+            h = int(self.pixbuf1.get_height()*factor)
+            #
+            self.image1.set_from_pixbuf(self.pixbuf1.scale_simple(
+                w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(self.pixbuf2.scale_simple(
+                w, h, GdkPixbuf.InterpType.BILINEAR))
+        elif event.keyval == 65457 or event.keyval == 49:
+            self.scale = 100
+        if self.image1:
+            w = int(self.pixbuf1.get_width()*self.scale/100)
+            h = int(self.pixbuf1.get_height()*self.scale/100)
+            #
+            self.image1.set_from_pixbuf(self.pixbuf1.scale_simple(
+                w, h, GdkPixbuf.InterpType.BILINEAR))
+            self.image2.set_from_pixbuf(self.pixbuf2.scale_simple(
+                w, h, GdkPixbuf.InterpType.BILINEAR))
+        if self.image1 and self.scale != scale:
+            self.slider_on_value_changed(None)
+
+    def close(self, widget):
+        self.renderer.stop()
+        self.destroy()
+
+
+class DefaultDialog(Gtk.Dialog):
+    def __init__(self, title, window):
+        Gtk.Dialog.__init__(self,
+                            title,
+                            window,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_size_request(300, 140)
+        self.set_resizable(False)
+        self.set_icon_name(NAME.lower())
+        self.connect('destroy', self.close_application)
+
+        vbox0 = Gtk.VBox(spacing=5)
+        vbox0.set_border_width(5)
+        self.get_content_area().add(vbox0)
+
+        notebook = Gtk.Notebook()
+        vbox0.add(notebook)
+
+        frame1 = Gtk.Frame()
+        notebook.append_page(frame1, tab_label=Gtk.Label(title))
+
+        table1 = Gtk.Table(rows=1, columns=1, homogeneous=False)
+        table1.set_border_width(5)
+        table1.set_col_spacings(5)
+        table1.set_row_spacings(5)
+        frame1.add(table1)
+
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table1.attach(self.rbutton0, 0, 2, 0, 1,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.show_all()
+
+    def close_application(self, widget):
+        self.hide()
+
+
+class RotateDialog(Gtk.Dialog):
+    def __init__(self):
+        Gtk.Dialog.__init__(self, _('Rotate images'), None,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_size_request(300, 140)
+        self.set_resizable(False)
+        self.set_icon_name(NAME.lower())
+        self.connect('destroy', self.close_application)
+        #
+        vbox0 = Gtk.VBox(spacing=5)
+        vbox0.set_border_width(5)
+        self.get_content_area().add(vbox0)
+        #
+        notebook = Gtk.Notebook()
+        vbox0.add(notebook)
+        #
+        frame1 = Gtk.Frame()
+        notebook.append_page(frame1, tab_label=Gtk.Label(_('Rotate images')))
+        #
+        table1 = Gtk.Table(rows=3, columns=2, homogeneous=False)
+        table1.set_border_width(5)
+        table1.set_col_spacings(5)
+        table1.set_row_spacings(5)
+        frame1.add(table1)
+        #
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table1.attach(self.rbutton0, 0, 2, 0, 1,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        label = Gtk.Label(_('Degrees') + ':')
+        table1.attach(label, 0, 1, 1, 2,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.sp = Gtk.SpinButton()
+        self.sp.set_adjustment(Gtk.Adjustment(90, 0, 360, 5, 45, 0))
+        self.sp.set_value(90)
+        table1.attach(self.sp, 1, 2, 1, 2,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+
+        self.rbutton1 = Gtk.RadioButton.new_from_widget(None)
+        self.rbutton1.add(Gtk.Image.new_from_icon_name(
+            'object-rotate-left', Gtk.IconSize.BUTTON))
+        table1.attach(self.rbutton1, 0, 1, 2, 3,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.rbutton2 = Gtk.RadioButton.new_from_widget(self.rbutton1)
+        self.rbutton2.add(Gtk.Image.new_from_icon_name(
+            'object-rotate-right', Gtk.IconSize.BUTTON))
+        table1.attach(self.rbutton2, 1, 2, 2, 3,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.show_all()
+
+    def get_options(self):
+        if self.rbutton1.get_active():
+            return (self.sp.get_value(),)
+        return (360 - self.sp.get_value(),)
+
+    def close_application(self, widget):
+        self.hide()
+
+
+class FlipDialog(Gtk.Dialog):
+    def __init__(self):
+        Gtk.Dialog.__init__(self, _('Flip images'), None,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_size_request(300, 140)
+        self.set_resizable(False)
+        self.set_icon_name(NAME.lower())
+        self.connect('destroy', self.close_application)
+        #
+        vbox0 = Gtk.VBox(spacing=5)
+        vbox0.set_border_width(5)
+        self.get_content_area().add(vbox0)
+        #
+        notebook = Gtk.Notebook()
+        vbox0.add(notebook)
+        #
+        frame1 = Gtk.Frame()
+        notebook.append_page(frame1, tab_label=Gtk.Label(_('Flip images')))
+        #
+        table1 = Gtk.Table(rows=2, columns=2, homogeneous=False)
+        table1.set_border_width(5)
+        table1.set_col_spacings(5)
+        table1.set_row_spacings(5)
+        frame1.add(table1)
+        #
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table1.attach(self.rbutton0, 0, 2, 0, 1,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.rbutton1 = Gtk.RadioButton.new_from_widget(None)
+        self.rbutton1.add(Gtk.Image.new_from_icon_name(
+            'object-flip-horizontal', Gtk.IconSize.BUTTON))
+        table1.attach(self.rbutton1, 0, 1, 1, 2,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.rbutton2 = Gtk.RadioButton.new_from_widget(self.rbutton1)
+        self.rbutton2.add(Gtk.Image.new_from_icon_name(
+            'object-flip-vertical', Gtk.IconSize.BUTTON))
+        table1.attach(self.rbutton2, 1, 2, 1, 2,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.show_all()
+
+    def get_options(self):
+        return (self.rbutton1.get_active(),)
+
+    def close_application(self, widget):
+        self.hide()
+
+
+class ResizeDialog(Gtk.Dialog):
+    def __init__(self):
+        Gtk.Dialog.__init__(self, _('Resize images'), None,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_size_request(300, 140)
+        self.set_resizable(False)
+        self.set_icon_name(NAME.lower())
+        self.connect('destroy', self.close_application)
+        #
+        vbox0 = Gtk.VBox(spacing=5)
+        vbox0.set_border_width(5)
+        self.get_content_area().add(vbox0)
+        #
+        notebook = Gtk.Notebook()
+        vbox0.add(notebook)
+        #
+        frame1 = Gtk.Frame()
+        notebook.append_page(frame1, tab_label=Gtk.Label(_('Flip images')))
+        #
+        table1 = Gtk.Table(rows=5, columns=3, homogeneous=False)
+        table1.set_border_width(5)
+        table1.set_col_spacings(5)
+        table1.set_row_spacings(5)
+        frame1.add(table1)
+        #
+        options = Gtk.ListStore(str, bool)
+        options.append([_('pixels'), False])
+        options.append([_('%'), True])
+        #
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table1.attach(self.rbutton0, 0, 3, 0, 1,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.rbutton1 = Gtk.CheckButton(_('Maintain aspect ratio?'))
+        self.rbutton1.connect('toggled', self.on_rbutton1_changed)
+        table1.attach(self.rbutton1, 0, 3, 1, 2,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        label1 = Gtk.Label(_('Width') + ':')
+        table1.attach(label1, 0, 1, 2, 3,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.width = Gtk.SpinButton()
+        self.width.set_adjustment(Gtk.Adjustment(100, 0, 1000, 1, 10, 0))
+        self.width.set_value(100)
+        self.width.connect('changed', self.on_width_changed)
+        table1.attach(self.width, 1, 2, 2, 3,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.width_pixels = Gtk.Entry()
+        self.width_pixels.set_text('256')
+        self.width_pixels.connect('changed', self.on_width_changed)
+        table1.attach(self.width_pixels, 1, 2, 2, 3,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.width_option = Gtk.ComboBox.new_with_model_and_entry(options)
+        self.width_option.set_entry_text_column(0)
+        self.width_option.connect("changed",
+                                  self.on_width_option_combo_changed)
+        self.width_option.set_active(0)
+        table1.attach(self.width_option, 2, 3, 2, 3,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+
+        label2 = Gtk.Label(_('Height') + ':')
+        table1.attach(label2, 0, 1, 3, 4,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.height = Gtk.SpinButton()
+        self.height.set_adjustment(Gtk.Adjustment(100, 0, 1000, 1, 10, 0))
+        self.height.set_value(100)
+        table1.attach(self.height, 1, 2, 3, 4,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.height_pixels = Gtk.Entry()
+        self.height_pixels.set_text('256')
+        table1.attach(self.height_pixels, 1, 2, 3, 4,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+
+        self.height_option = Gtk.ComboBox.new_with_model_and_entry(options)
+        self.height_option.set_entry_text_column(0)
+        self.height_option.connect("changed",
+                                   self.on_height_option_combo_changed)
+        self.height_option.set_active(0)
+        table1.attach(self.height_option, 2, 3, 3, 4,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+
+        quality_options = Gtk.ListStore(str, int)
+        quality_options.append([_('Fast'), RESIZE_FAST])
+        quality_options.append([_('Balanced'), RESIZE_BALANCED])
+        quality_options.append([_('Best'), RESIZE_BEST])
+        label3 = Gtk.Label(_('Quality') + ':')
+        table1.attach(label3, 0, 1, 4, 5,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.quality = Gtk.ComboBox.new_with_model_and_entry(quality_options)
+        self.quality.set_entry_text_column(0)
+        self.quality.set_active(1)
+        table1.attach(self.quality, 1, 3, 4, 5,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.show_all()
+        self.width_pixels.set_visible(True)
+        self.width.set_visible(False)
+        self.height_pixels.set_visible(True)
+        self.height.set_visible(False)
+
+    def get_percentage_width(self):
+        tree_iter = self.width_option.get_active_iter()
+        if tree_iter is not None:
+            model = self.width_option.get_model()
+            name, isornotis = model[tree_iter][:2]
+        else:
+            entry = self.width_option.get_child()
+            name = entry.get_text()
+        return name == '%'
+
+    def get_width(self):
+        tree_iter = self.width_option.get_active_iter()
+        if tree_iter is not None:
+            model = self.width_option.get_model()
+            name, isornotis = model[tree_iter][:2]
+        else:
+            entry = self.width_option.get_child()
+            name = entry.get_text()
+        if name == '%':
+            return float(self.width.get_value())
+        return float(self.width_pixels.get_text())
+
+    def get_height(self):
+        tree_iter = self.height_option.get_active_iter()
+        if tree_iter is not None:
+            model = self.height_option.get_model()
+            name, isornotis = model[tree_iter][:2]
+        else:
+            entry = self.height_option.get_child()
+            name = entry.get_text()
+        if name == '%':
+            return float(self.height.get_value())
+        return float(self.height_pixels.get_text())
+
+    def get_percentage_height(self):
+        tree_iter = self.height_option.get_active_iter()
+        if tree_iter is not None:
+            model = self.height_option.get_model()
+            name, isornotis = model[tree_iter][:2]
+        else:
+            entry = self.height_option.get_child()
+            name = entry.get_text()
+        return name == '%'
+
+    def get_quality(self):
+        tree_iter = self.quality.get_active_iter()
+        if tree_iter is not None:
+            model = self.quality.get_model()
+            return model[tree_iter][1]
+        return RESIZE_BALANCED
+
+    def get_options(self):
+        return (self.rbutton1.get_active(),
+                self.get_percentage_width(), self.get_percentage_height(),
+                self.get_width(), self.get_height(), self.get_quality())
+
+    def on_rbutton1_changed(self, widget):
+        self.height_pixels.set_sensitive(not self.rbutton1.get_active())
+        self.height.set_sensitive(not self.rbutton1.get_active())
+        self.height_option.set_sensitive(not self.rbutton1.get_active())
+
+    def on_width_option_combo_changed(self, widget):
+        tree_iter = widget.get_active_iter()
+        if tree_iter is not None:
+            model = widget.get_model()
+            name, isornotis = model[tree_iter][:2]
+        else:
+            entry = widget.get_child()
+            name = entry.get_text()
+        if name == '%':
+            self.width_pixels.set_visible(False)
+            self.width.set_visible(True)
+        else:
+            self.width_pixels.set_visible(True)
+            self.width.set_visible(False)
+        if self.rbutton1.get_active():
+            self.height_option.set_active(self.width_option.get_active())
+
+    def on_width_changed(self, widget):
+        if self.rbutton1.get_active():
+            self.height.set_value(self.width.get_value())
+            self.height_pixels.set_text(self.width_pixels.get_text())
+
+    def on_height_option_combo_changed(self, widget):
+        tree_iter = widget.get_active_iter()
+        if tree_iter is not None:
+            model = widget.get_model()
+            name, isornotis = model[tree_iter][:2]
+        else:
+            entry = widget.get_child()
+            name = entry.get_text()
+        if name == '%':
+            self.height_pixels.set_visible(False)
+            self.height.set_visible(True)
+        else:
+            self.height_pixels.set_visible(True)
+            self.height.set_visible(False)
+
+    def close_application(self, widget):
+        self.hide()
+
+
+class RecipeDialog(Gtk.Dialog):
+    def __init__(self, window, image_filename):
+        Gtk.Dialog.__init__(self, _('Recipe'), window,
+                            Gtk.DialogFlags.MODAL |
+                            Gtk.DialogFlags.DESTROY_WITH_PARENT,
+                            (Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT,
+                             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
+        self.set_size_request(350, 300)
+        self.set_resizable(False)
+        self.set_icon_name(NAME.lower())
+        self.connect('destroy', self.close_application)
+        self.image_filename = image_filename
+        self.steps = []
+        #
+        vbox0 = Gtk.VBox(spacing=5)
+        vbox0.set_border_width(5)
+        self.get_content_area().add(vbox0)
+        #
+        notebook = Gtk.Notebook()
+        vbox0.add(notebook)
+        #
+        frame1 = Gtk.Frame()
+        notebook.append_page(frame1, tab_label=Gtk.Label(_('Recipe')))
+        #
+        table1 = Gtk.Table(rows=4, columns=3, homogeneous=False)
+        table1.set_border_width(5)
+        table1.set_col_spacings(5)
+        table1.set_row_spacings(5)
+        frame1.add(table1)
+        #
+        self.rbutton0 = Gtk.CheckButton(_('Overwrite original file?'))
+        table1.attach(self.rbutton0, 0, 3, 0, 1,
+                      xoptions=Gtk.AttachOptions.EXPAND,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        options = Gtk.ListStore(str, str)
+        for name, label in RECIPE_STEPS:
+            options.append([label, name])
+        self.operation = Gtk.ComboBox.new_with_model_and_entry(options)
+        self.operation.set_entry_text_column(0)
+        self.operation.set_active(0)
+        table1.attach(self.operation, 0, 2, 1, 2,
+                      xoptions=Gtk.AttachOptions.FILL,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        button_add = Gtk.Button(_('Add'))
+        button_add.connect('clicked', self.on_button_add_clicked)
+        table1.attach(button_add, 2, 3, 1, 2,
+                      xoptions=Gtk.AttachOptions.FILL,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        #
+        self.store = Gtk.ListStore(str)
+        self.treeview = Gtk.TreeView(self.store)
+        self.treeview.append_column(Gtk.TreeViewColumn(
+            _('Steps'), Gtk.CellRendererText(), text=0))
+        scrolledwindow = Gtk.ScrolledWindow()
+        scrolledwindow.set_size_request(300, 180)
+        scrolledwindow.add(self.treeview)
+        table1.attach(scrolledwindow, 0, 3, 2, 3,
+                      xoptions=Gtk.AttachOptions.FILL,
+                      yoptions=Gtk.AttachOptions.EXPAND)
+        button_remove = Gtk.Button(_('Remove'))
+        button_remove.connect('clicked', self.on_button_remove_clicked)
+        table1.attach(button_remove, 2, 3, 3, 4,
+                      xoptions=Gtk.AttachOptions.FILL,
+                      yoptions=Gtk.AttachOptions.SHRINK)
+        self.show_all()
+
+    def get_step_options(self, name):
+        if name == 'enhance':
+            rd = EnhanceDialog(_('Enhance image'), self, self.image_filename)
+        elif name == 'flip':
+            rd = FlipDialog()
+        elif name == 'resize':
+            rd = ResizeDialog()
+            size = get_size([self.image_filename])
+            if size is not None:
+                rd.width_pixels.set_text(str(size[0]))
+                rd.height_pixels.set_text(str(size[1]))
+        elif name == 'rotate':
+            rd = RotateDialog()
+        elif name == 'vintage':
+            rd = VintageDialog(_('Vintage'), self.image_filename)
+        elif name == 'watermark':
+            rd = WatermarkDialog(self.image_filename)
+        else:
+            return ()
+        # the recipe decides whether the original file is overwritten
+        rd.rbutton0.set_visible(False)
+        options = None
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            options = rd.get_options()
+        rd.destroy()
+        return options
+
+    def on_button_add_clicked(self, widget):
+        tree_iter = self.operation.get_active_iter()
+        if tree_iter is not None:
+            model = self.operation.get_model()
+            label, name = model[tree_iter][:2]
+            options = self.get_step_options(name)
+            if options is not None:
+                self.steps.append((name, options))
+                self.store.append([label])
+
+    def on_button_remove_clicked(self, widget):
+        model, tree_iter = self.treeview.get_selection().get_selected()
+        if tree_iter is not None:
+            del self.steps[model.get_path(tree_iter).get_indices()[0]]
+            model.remove(tree_iter)
+
+    def get_options(self):
+        return (list(self.steps),)
+
+    def close_application(self, widget):
+        self.hide()
+
+
+def make_proxy(image, scale):
+    # Previews show the image at scale %. Below 100 % the effects are run
+    # on a copy at the displayed size instead of the full image
+    if scale >= 100:
+        return image
+    width = max(1, int(image.size[0] * scale / 100))
+    height = max(1, int(image.size[1] * scale / 100))
+    return image.resize((width, height), Image.BILINEAR)
+
+
+def image2pixbuf(image):
+    # The pixels are handed to GdkPixbuf as they are, without encoding them
+    # to an intermediate format
+    if image.mode not in ('RGB', 'RGBA'):
+        if 'A' in image.getbands() or 'transparency' in image.info:
+            image = image.convert('RGBA')
+        else:
+            image = image.convert('RGB')
+    has_alpha = image.mode == 'RGBA'
+    width, height = image.size
+    return GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes.new(image.tobytes()), GdkPixbuf.Colorspace.RGB, has_alpha,
+        8, width, height, width * len(image.mode))
+
+
+def pixbuf2image(pixbuf):
+    if pixbuf.get_has_alpha():
+        mode = 'RGBA'
+    else:
+        mode = 'RGB'
+    # rows of a pixbuf may be padded, so the rowstride has to be used
+    return Image.frombuffer(mode, (pixbuf.get_width(), pixbuf.get_height()),
+                            pixbuf.get_pixels(), 'raw', mode,
+                            pixbuf.get_rowstride(), 1)
+
+
+def about(window, files):
+    ad = Gtk.AboutDialog(parent=window)
+    ad.set_name(APP)
+    ad.set_version(VERSION)
+    ad.set_copyright('Copyrignt (c) 2016\nLorenzo Carbonell')
+    ad.set_comments(APP)
+    ad.set_license('''
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+''')
+    ad.set_website('http://www.atareao.es')
+    ad.set_website_label('http://www.atareao.es')
+    ad.set_authors([
+        'Lorenzo Carbonell <lorenzo.carbonell.cerezo@gmail.com>'])
+    ad.set_documenters([
+        'Lorenzo Carbonell <lorenzo.carbonell.cerezo@gmail.com>'])
+    ad.set_icon_name(APP)
+    ad.set_logo_icon_name(APP)
+    ad.run()
+    ad.destroy()
+
+
+def enhance_images(window, files):
+    if len(files) > 0:
+        rd = EnhanceDialog(_('Enhance image'), window, files[0])
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Enhance images'), window, files,
+                          enhance_image,
+                          rd.rbutton0.get_active(),
+                          *rd.get_options())
+        rd.destroy()
+
+
+def rotate_images(window, files):
+    if len(files) > 0:
+        rd = RotateDialog()
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Rotate images'), window, files,
+                          rotate_image,
+                          rd.rbutton0.get_active(),
+                          *rd.get_options())
+        rd.destroy()
+
+
+def resize_images(window, files):
+    if len(files) > 0:
+        rd = ResizeDialog()
+        size = get_size(files)
+        if size is not None:
+            rd.width_pixels.set_text(str(size[0]))
+            rd.height_pixels.set_text(str(size[1]))
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Resize images'), window, files,
+                          resize_image,
+                          rd.rbutton0.get_active(),
+                          *rd.get_options())
+        rd.destroy()
+
+
+def flip_images(window, files):
+    if len(files) > 0:
+        rd = FlipDialog()
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Flip images'), window, files,
+                          flip_image,
+                          rd.rbutton0.get_active(),
+                          *rd.get_options())
+        rd.destroy()
+
+
+def negative_images(window, files):
+    if len(files) > 0:
+        rd = DefaultDialog(_('Negative'), window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Negative'), window, files,
+                          negative_image,
+                          rd.rbutton0.get_active())
+        rd.destroy()
+
+
+def black_and_white_images(window, files):
+    if len(files) > 0:
+        rd = DefaultDialog(_('Black & White'), window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Black & White'), window, files,
+                          black_white_image,
+                          rd.rbutton0.get_active())
+        rd.destroy()
+
+
+def greyscale_images(window, files):
+    if len(files) > 0:
+        rd = DefaultDialog(_('Grey scale'), window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Grey scale'), window, files,
+                          greyscale_image,
+                          rd.rbutton0.get_active())
+        rd.destroy()
+
+
+def vintage_images(window, files):
+    if len(files) > 0:
+        rd = VintageDialog(_('Vintage'), files[0])
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Vintage'), window, files,
+                          vintage_image,
+                          rd.rbutton0.get_active(),
+                          *rd.get_options())
+        rd.destroy()
+
+
+def blur_images(window, files):
+    if len(files) > 0:
+        rd = DefaultDialog(_('Blur'), window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Blur'), window, files,
+                          blur_image,
+                          rd.rbutton0.get_active())
+        rd.destroy()
+
+
+def contour_images(window, files):
+    if len(files) > 0:
+        rd = DefaultDialog(_('Contour'), window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Contour'), window, files,
+                          contour_image,
+                          rd.rbutton0.get_active())
+        rd.destroy()
+
+
+def shadow_images(window, files):
+    if len(files) > 0:
+        rd = DefaultDialog(_('Shadow'), window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Shadow'), window, files,
+                          shadow_image,
+                          rd.rbutton0.get_active())
+        rd.destroy()
+
+
+def watermark_images(window, files):
+    if len(files) > 0:
+        rd = WatermarkDialog(files[0])
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Watermark'), window, files,
+                          watermark_image,
+                          rd.rbutton0.get_active(),
+                          *rd.get_options())
+        rd.destroy()
+
+
+def border_images(window, files):
+    if len(files) > 0:
+        rd = DefaultDialog(_('Border'), window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            rd.hide()
+            process_files(_('Border'), window, files,
+                          border_image,
+                          rd.rbutton0.get_active(),
+                          -1, 'white')
+        rd.destroy()
+
+
+def recipe_images(window, files):
+    if len(files) > 0:
+        rd = RecipeDialog(window, files[0])
+        if rd.run() == Gtk.ResponseType.ACCEPT and len(rd.steps) > 0:
+            rd.hide()
+            process_files(_('Recipe'), window, files,
+                          recipe_image,
+                          rd.rbutton0.get_active(),
+                          *rd.get_options())
+        rd.destroy()
+
+
+def resume_batches(window, files):
+    for journal in get_journals():
+        pending = journal.get_pending()
+        if len(pending) == 0:
+            journal.remove()
+            continue
+        process_files(_('Resume batch'), window, pending,
+                      journal.get_function(), *journal.args,
+                      journal=journal)
+
+
+def discard_batches(window, files):
+    md = Gtk.MessageDialog(window, 0, Gtk.MessageType.QUESTION,
+                           Gtk.ButtonsType.YES_NO,
+                           _('Discard the batches that did not finish?'))
+    if md.run() == Gtk.ResponseType.YES:
+        discard_journals()
+    md.destroy()
+
+
+def convert_images(window, files):
+    if len(files) > 0:
+        rd = ConvertDialog(window)
+        if rd.run() == Gtk.ResponseType.ACCEPT:
+            convert_to = rd.get_convert_to()
+            rd.hide()
+            process_files(_('Convert images'), window, files,
+                          convert_image,
+                          convert_to)
+        rd.destroy()
@@ -0,0 +1,954 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The image operations. Each *_image function processes one file, and
+# the functions without the suffix work on images in memory
+
+import os
+import math
+import io
+import shutil
+import subprocess
+import tempfile
+from distutils.spawn import find_executable
+from collections import OrderedDict
+from PIL import Image
+from PIL import ImageOps
+from PIL import ImageChops
+from PIL import ImageFilter
+from PIL import ImageFont
+from PIL import ImageDraw
+from PIL import ImageEnhance
+from PIL import ImageStat
+from PIL.ExifTags import TAGS
+import random
+import time
+
+# file read ahead and images to write of the job a worker is running, when
+# it runs in a Pipeline
+PIPELINED = {}
+
+# Time spent opening and saving, and bytes written, by the file being
+# processed in this process. Only filled when the batch is timed
+JOB_STATS = {}
+
+# files are created with the permissions the user would get from the shell
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# Resize quality. Fast and balanced decode JPEG files at a reduced size,
+# at least the target size or twice the target size, before resampling
+RESIZE_FAST = 0
+RESIZE_BALANCED = 1
+RESIZE_BEST = 2
+RESIZE_QUALITIES = {'fast': RESIZE_FAST,
+                    'balanced': RESIZE_BALANCED,
+                    'best': RESIZE_BEST}
+
+
+def get_temporal(file_out):
+    # A hidden file next to file_out, with the same extension, to write
+    # to before it is renamed over file_out by replace_file
+    directory, name = os.path.split(os.path.abspath(file_out))
+    fd, temporal = tempfile.mkstemp(prefix='.' + name + '.',
+                                    suffix=os.path.splitext(name)[1],
+                                    dir=directory)
+    os.close(fd)
+    return temporal
+
+
+def replace_file(temporal, file_out):
+    # rename is atomic, so file_out is either the old file or the new one,
+    # never a half written one, whenever the process is stopped
+    if os.path.exists(file_out):
+        shutil.copymode(file_out, temporal)
+    else:
+        os.chmod(temporal, 0o666 & ~UMASK)
+    os.rename(temporal, file_out)
+
+# #######################################################################
+# #################### FUNCIONES AUXILIARES #############################
+# #######################################################################
+
+
+FONT = '/usr/share/fonts/truetype/ubuntu-font-family/UbuntuMono-R.ttf'
+RATIO = 0.1
+MARGIN = 20
+TOP = False
+# Fonts already loaded, by (font file, size), and font sizes already
+# computed, by (font file, image width, text)
+FONTS = {}
+FONT_SIZES = {}
+
+VINTAGE_COLOR_LEVELS = {
+    'r': [0, 0, 0, 1, 1, 2, 3, 3, 3, 4, 4, 4, 5, 5, 5, 6, 6, 7, 7, 7, 7, 8, 8,
+          8, 9, 9, 9, 9, 10, 10, 10, 10, 11, 11, 12, 12, 12, 12, 13, 13, 13,
+          14, 14, 15, 15, 16, 16, 17, 17, 17, 18, 19, 19, 20, 21, 22, 22, 23,
+          24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 39, 40, 41,
+          42, 44, 45, 47, 48, 49, 52, 54, 55, 57, 59, 60, 62, 65, 67, 69, 70,
+          72, 74, 77, 79, 81, 83, 86, 88, 90, 92, 94, 97, 99, 101, 103, 107,
+          109, 111, 112, 116, 118, 120, 124, 126, 127, 129, 133, 135, 136, 140,
+          142, 143, 145, 149, 150, 152, 155, 157, 159, 162, 163, 165, 167, 170,
+          171, 173, 176, 177, 178, 180, 183, 184, 185, 188, 189, 190, 192, 194,
+          195, 196, 198, 200, 201, 202, 203, 204, 206, 207, 208, 209, 211, 212,
+          213, 214, 215, 216, 218, 219, 219, 220, 221, 222, 223, 224, 225, 226,
+          227, 227, 228, 229, 229, 230, 231, 232, 232, 233, 234, 234, 235, 236,
+          236, 237, 238, 238, 239, 239, 240, 241, 241, 242, 242, 243, 244, 244,
+          245, 245, 245, 246, 247, 247, 248, 248, 249, 249, 249, 250, 251, 251,
+          252, 252, 252, 253, 254, 254, 254, 255, 255, 255, 255, 255, 255, 255,
+          255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+          255, 255, 255, 255, 255, 255, 255, 255],
+    'g': [0, 0, 1, 2, 2, 3, 5, 5, 6, 7, 8, 8, 10, 11, 11, 12, 13, 15, 15, 16,
+          7, 18, 18, 19, 21, 22, 22, 23, 24, 26, 26, 27, 28, 29, 31, 31, 32,
+          33, 34, 35, 35, 37, 38, 39, 40, 41, 43, 44, 44, 45, 46, 47, 48, 50,
+          51, 52, 53, 54, 56, 57, 58, 59, 60, 61, 63, 64, 65, 66, 67, 68, 69,
+          71, 72, 73, 74, 75, 76, 77, 79, 80, 81, 83, 84, 85, 86, 88, 89, 90,
+          92, 93, 94, 95, 96, 97, 100, 101, 102, 103, 105, 106, 107, 108, 109,
+          111, 113, 114, 115, 117, 118, 119, 120, 122, 123, 124, 126, 127,
+          128, 129, 131, 132, 133, 135, 136, 137, 138, 140, 141, 142, 144,
+          145, 146, 148, 149, 150, 151, 153, 154, 155, 157, 158, 159, 160,
+          162, 163, 164, 166, 167, 168, 169, 171, 172, 173, 174, 175, 176,
+          177, 178, 179, 181, 182, 183, 184, 186, 186, 187, 188, 189, 190,
+          192, 193, 194, 195, 195, 196, 197, 199, 200, 201, 202, 202, 203,
+          204, 205, 206, 207, 208, 208, 209, 210, 211, 212, 213, 214, 214,
+          215, 216, 217, 218, 219, 219, 220, 221, 222, 223, 223, 224, 225,
+          226, 226, 227, 228, 228, 229, 230, 231, 232, 232, 232, 233, 234,
+          235, 235, 236, 236, 237, 238, 238, 239, 239, 240, 240, 241, 242,
+          242, 242, 243, 244, 245, 245, 246, 246, 247, 247, 248, 249, 249,
+          249, 250, 251, 251, 252, 252, 252, 253, 254, 255],
+    'b': [53, 53, 53, 54, 54, 54, 55, 55, 55, 56, 57, 57, 57, 58, 58, 58, 59,
+          59, 59, 60, 61, 61, 61, 62, 62, 63, 63, 63, 64, 65, 65, 65, 66, 66,
+          67, 67, 67, 68, 69, 69, 69, 70, 70, 71, 71, 72, 73, 73, 73, 74, 74,
+          75, 75, 76, 77, 77, 78, 78, 79, 79, 80, 81, 81, 82, 82, 83, 83, 84,
+          85, 85, 86, 86, 87, 87, 88, 89, 89, 90, 90, 91, 91, 93, 93, 94, 94,
+          95, 95, 96, 97, 98, 98, 99, 99, 100, 101, 102, 102, 103, 104, 105,
+          105, 106, 106, 107, 108, 109, 109, 110, 111, 111, 112, 113, 114, 114,
+          115, 116, 117, 117, 118, 119, 119, 121, 121, 122, 122, 123, 124, 125,
+          126, 126, 127, 128, 129, 129, 130, 131, 132, 132, 133, 134, 134, 135,
+          136, 137, 137, 138, 139, 140, 140, 141, 142, 142, 143, 144, 145, 145,
+          146, 146, 148, 148, 149, 149, 150, 151, 152, 152, 153, 153, 154, 155,
+          156, 156, 157, 157, 158, 159, 160, 160, 161, 161, 162, 162, 163, 164,
+          164, 165, 165, 166, 166, 167, 168, 168, 169, 169, 170, 170, 171, 172,
+          172, 173, 173, 174, 174, 175, 176, 176, 177, 177, 177, 178, 178, 179,
+          180, 180, 181, 181, 181, 182, 182, 183, 184, 184, 184, 185, 185, 186,
+          186, 186, 187, 188, 188, 188, 189, 189, 189, 190, 190, 191, 191, 192,
+          192, 193, 193, 193, 194, 194, 194, 195, 196, 196, 196, 197, 197, 197,
+          198, 199]
+    }
+
+
+def get_average_pixel(image, x0, y0, x1, y1):
+    region = image.crop((x0, y0, x1, y1))
+    if region.mode != 'RGB':
+        region = region.convert('RGB')
+    r, g, b = ImageStat.Stat(region).mean
+    return int(r), int(g), int(b), region.size[0] * region.size[1]
+
+
+def get_exif(image):
+    try:
+        ret = {}
+        info = image._getexif()
+        for tag, value in info.items():
+            decoded = TAGS.get(tag, tag)
+            ret[decoded] = value
+        return ret
+    except Exception as e:
+        return None
+
+
+def get_date(image, fn):
+    exif = get_exif(image)
+    if exif and 'DateTimeOriginal' in exif.keys():
+        date = exif['DateTimeOriginal'].split(' ')[0].split(':')
+    else:
+        date = time.localtime(os.path.getctime(fn))
+    return ('%s/%s/%s' % (date[2], date[1], date[0]))
+
+
+def get_font(font_file, fontsize):
+    key = (font_file, fontsize)
+    if key not in FONTS:
+        FONTS[key] = ImageFont.truetype(font_file, fontsize)
+    return FONTS[key]
+
+
+def get_fontsize(text, width, font_file=FONT):
+    # The size depends on the glyphs of text, as font_file may not be
+    # monospaced, and is reused for every image of the same width with the
+    # same date in a batch
+    key = (font_file, width, text)
+    if key in FONT_SIZES:
+        return FONT_SIZES[key]
+    limit = RATIO * width
+    # look for the first size whose text is at least as wide as the limit
+    low = 0
+    high = 1
+    while get_font(font_file, high).getsize(text)[0] < limit:
+        low = high
+        high *= 2
+    while high - low > 1:
+        middle = (low + high) / 2
+        if get_font(font_file, middle).getsize(text)[0] < limit:
+            low = middle
+        else:
+            high = middle
+    FONT_SIZES[key] = max(high - 1, 1)
+    return FONT_SIZES[key]
+
+
+def write_date(im, date):
+    f = get_font(FONT, get_fontsize(date, im.size[0]))
+    largo, alto = im.size
+    l, a = f.getsize(date)
+    if TOP:
+        x0 = MARGIN
+        y0 = MARGIN
+    else:
+        x0 = largo - l - MARGIN
+        y0 = alto - a - MARGIN
+    x1 = x0 + l
+    y1 = y0 + a
+    # the background has to be measured before the text is drawn over it
+    r, g, b, c = get_average_pixel(im, x0, y0, x1, y1)
+    d = ImageDraw.Draw(im)
+    d.text((x0, y0), date, font=f,
+           fill='rgb(%s, %s, %s)' % (255 - r, 255 - g, 255 - b))
+    return im
+
+
+def add_noise(im, noise_level=20, seed=None):
+    # The same uniform noise in [-noise_level/2, noise_level/2] is added to
+    # every band of a pixel. The noise field is generated a row at a time,
+    # so that a generator shared by the strips of an image gives the same
+    # noise as the whole image, and applied with C-level band operations.
+    # seed can also be a generator
+    noise_level = int(noise_level)
+    if noise_level <= 0:
+        return im
+    half = noise_level / 2
+    width, height = im.size
+    if isinstance(seed, random.Random):
+        generator = seed
+    else:
+        generator = random.Random(seed)
+    field = Image.frombytes('L', im.size, ''.join(
+        '%0*x' % (2 * width, generator.getrandbits(8 * width))
+        for row in range(height)).decode('hex'))
+    levels = [value * (noise_level + 1) / 256 for value in range(256)]
+    positive = field.point([max(level - half, 0) for level in levels])
+    negative = field.point([max(half - level, 0) for level in levels])
+    bands = []
+    for name, band in zip(im.getbands(), im.split()):
+        if name != 'A':
+            band = ImageChops.subtract(ImageChops.add(band, positive),
+                                       negative)
+        bands.append(band)
+    return Image.merge(im.mode, bands)
+
+
+def vintage_colors(im, color_map=VINTAGE_COLOR_LEVELS):
+    # expect rgb; the three levels are applied in a single lookup table pass
+    return im.point(color_map['r'] + color_map['g'] + color_map['b'])
+
+
+def get_shadow_mask(size, iterations, border, offset):
+    # The shadow is a blurred rectangle, so its alpha mask only depends on
+    # the size of the image and is shared by images of the same size
+    key = (size, iterations, border, offset)
+    if key in SHADOWS:
+        return SHADOWS[key]
+    fullWidth = size[0] + abs(offset[0]) + 2 * border
+    fullHeight = size[1] + abs(offset[1]) + 2 * border
+    mask = Image.new('L', (fullWidth, fullHeight), 0)
+    shadowLeft = border + max(offset[0], 0)
+    shadowTop = border + max(offset[1], 0)
+    mask.paste(255, [shadowLeft, shadowTop,
+                     shadowLeft + size[0], shadowTop + size[1]])
+    # Applying ImageFilter.BLUR n times is close to a gaussian blur with a
+    # variance of 2.75 * n, the variance of its 5x5 kernel, and a gaussian
+    # blur is done in one separable pass
+    if iterations > 0:
+        mask = mask.filter(ImageFilter.GaussianBlur(
+            math.sqrt(BLUR_VARIANCE * iterations)))
+    SHADOWS[key] = mask
+    if len(SHADOWS) > SHADOWS_SIZE:
+        SHADOWS.popitem(last=False)
+    return mask
+
+
+def makeShadow(image, iterations, border, offset, backgroundColour,
+               shadowColour, alpha=True):
+    # image: base image to give a drop shadow
+    # iterations: number of times to apply the blur filter to the shadow
+    # border: border to give the image to leave space for the shadow
+    # offset: offset of the shadow as [x,y]
+    # backgroundCOlour: colour of the background, if there is no alpha
+    # shadowColour: colour of the drop shadow
+    # alpha: whether the result keeps a transparent background
+    mask = get_shadow_mask(image.size, iterations, border, offset)
+    if alpha:
+        shadow = Image.new('RGBA', mask.size, shadowColour)
+        shadow.putalpha(mask)
+    else:
+        shadow = Image.new('RGB', mask.size, backgroundColour)
+        shadow.paste(shadowColour, (0, 0) + mask.size, mask)
+
+    # Paste the original image on top of the shadow
+    imgLeft = border - min(offset[0], 0)
+    imgTop = border - min(offset[1], 0)
+    shadow.paste(image, (imgLeft, imgTop))
+
+    return shadow
+
+
+# Blurred shadow masks, by (size, iterations, border, offset), oldest first
+SHADOWS = OrderedDict()
+SHADOWS_SIZE = 4
+BLUR_VARIANCE = 2.75
+# Formats that can not store a transparent background
+OPAQUE_EXTENSIONS = ['.bmp', '.jpg', '.jpeg', '.pcx', '.pnm', '.ras', '.xbm']
+# Images whose decoded size is over MEMORY_CEILING bytes are processed in
+# strips of about STRIP_MEMORY bytes by the operations that allow it.
+# Filters look at most FILTER_MARGIN rows around each pixel
+MEMORY_CEILING = 256 * 1024 * 1024
+STRIP_MEMORY = 16 * 1024 * 1024
+FILTER_MARGIN = 2
+# Decoded watermarks, by (file, modification time, scale), oldest first
+WATERMARKS = OrderedDict()
+WATERMARKS_SIZE = 8
+# Rotations, counterclockwise like Image.rotate, that can be done exactly
+# by moving pixels. jpegtran rotates clockwise
+TRANSPOSE_ROTATIONS = {
+    90: Image.ROTATE_90,
+    180: Image.ROTATE_180,
+    270: Image.ROTATE_270,
+    }
+JPEGTRAN_ROTATIONS = {
+    90: '270',
+    180: '180',
+    270: '90',
+    }
+JPEGTRAN = find_executable('jpegtran')
+
+# Relative cost per megapixel of each operation, decoding and encoding
+# included, so that the progress of a batch follows the work done
+OPERATION_COSTS = {
+    'enhance_image': 1.5,
+    'resize_image': 0.5,
+    'shadow_image': 2.0,
+    'vintage_image': 2.5,
+    'watermark_image': 1.2,
+    }
+FILTER_COST = 1.3
+JPEGTRAN_COST = 0.1
+RECIPE_STEP_COST = 0.5
+# Decoded copies of the image each operation keeps at the same time. The
+# ones that work in strips, or in place, keep a single copy over
+# MEMORY_CEILING
+OPERATION_COPIES = {
+    'recipe_image': 3,
+    'shadow_image': 4,
+    'vintage_image': 3,
+    }
+DEFAULT_COPIES = 2
+
+
+def get_memory_size(image):
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+
+def get_decoded_size(header):
+    # bytes of the image of a probed header once decoded. PIL keeps a byte
+    # per pixel of 1, L and P images, and four of most of the others
+    if header['mode'] in ('1', 'L', 'P'):
+        pixel = 1
+    elif header['mode'].startswith('I;16'):
+        pixel = 2
+    else:
+        pixel = 4
+    return header['width'] * header['height'] * pixel
+
+
+def works_in_strips(whattodo, args, mode):
+    # whether whattodo, with args after file_in, transforms images of mode
+    # over MEMORY_CEILING in strips or in place, as the *_image functions
+    # do
+    name = whattodo.__name__[:-len('_image')]
+    if name in FILTERS:
+        return True
+    if name == 'watermark':
+        return mode in ('RGB', 'RGBA')
+    if name in ('enhance', 'negative', 'vintage'):
+        # args starts with overwrite
+        return get_strip_margin(name, args[1:]) is not None
+    return False
+
+
+def get_footprint(whattodo, args, header):
+    # Estimated memory processing the file of header takes at its peak:
+    # its decoded copies, and the file and its output in memory
+    decoded = get_decoded_size(header)
+    name = whattodo.__name__
+    if decoded > MEMORY_CEILING and works_in_strips(whattodo, args,
+                                                    header['mode']):
+        copies = decoded + 2 * STRIP_MEMORY
+    else:
+        copies = decoded * OPERATION_COPIES.get(name, DEFAULT_COPIES)
+    return copies + 2 * header['size']
+
+
+def get_work(file_in, whattodo, args=(), header=None):
+    # Estimated work of processing file_in. Only the header is read, or
+    # nothing when header, what probe_image read of it, is given
+    if header is None:
+        try:
+            image = Image.open(file_in)
+        except IOError:
+            return 0.0
+        image_format = image.format
+        width, height = image.size
+    else:
+        image_format = header['format']
+        width, height = header['width'], header['height']
+    megapixels = width * height / 1000000.0
+    name = whattodo.__name__
+    # args are (overwrite, degrees) for rotate_image
+    lossless = name == 'flip_image' or (
+        name == 'rotate_image' and len(args) > 1 and
+        args[1] % 360 in JPEGTRAN_ROTATIONS)
+    if lossless and JPEGTRAN is not None and image_format == 'JPEG':
+        cost = JPEGTRAN_COST
+    elif name == 'recipe_image':
+        cost = 1.0 + RECIPE_STEP_COST * len(args[1] if len(args) > 1 else ())
+    elif name[:-len('_image')] in FILTERS:
+        cost = FILTER_COST
+    else:
+        cost = OPERATION_COSTS.get(name, 1.0)
+    return megapixels * cost
+
+
+def transform_in_strips(image, function, margin=None):
+    # Images over MEMORY_CEILING bytes are transformed in place, one strip
+    # of rows at a time, instead of keeping several full size copies.
+    # function must keep the mode and the size, and margin is the number
+    # of rows around a strip it needs. None means it needs the whole image
+    if margin is None or get_memory_size(image) <= MEMORY_CEILING:
+        return function(image)
+    width, height = image.size
+    rows = max(margin, 1, STRIP_MEMORY / (width * len(image.getbands())))
+    image.load()
+    previous = None
+    for top in range(0, height, rows):
+        bottom = min(height, top + rows)
+        first = max(0, top - margin)
+        region = image.crop((0, first, width, min(height, bottom + margin)))
+        region.load()
+        if previous is not None:
+            # the rows above the strip have already been transformed
+            region.paste(previous, (0, 0))
+        if margin > 0:
+            previous = image.crop((0, bottom - margin, width, bottom))
+            previous.load()
+        region = function(region)
+        image.paste(region.crop((0, top - first, width, bottom - first)),
+                    (0, top))
+    return image
+
+
+def timed(phase, function, *args):
+    # Adds the time function takes to phase in JOB_STATS, when timing
+    if 'enabled' not in JOB_STATS:
+        return function(*args)
+    start = time.time()
+    try:
+        return function(*args)
+    finally:
+        JOB_STATS[phase] = JOB_STATS.get(phase, 0.0) + time.time() - start
+
+
+def open_image(file_in):
+    if PIPELINED.get('file') == file_in and PIPELINED['data'] is not None:
+        try:
+            return timed('open', Image.open, io.BytesIO(PIPELINED['data']))
+        except IOError:
+            raise IOError('cannot identify image file %r' % file_in)
+    return timed('open', Image.open, file_in)
+
+
+def get_format(file_out):
+    Image.init()
+    return Image.EXTENSION[os.path.splitext(file_out)[1].lower()]
+
+
+def write_image(image_out, file_out):
+    if 'writes' in PIPELINED:
+        # the write stage of the Pipeline saves it to disk
+        buff = io.BytesIO()
+        timed('save', image_out.save, buff, get_format(file_out))
+        PIPELINED['writes'].append((file_out, buff.getvalue()))
+        size = buff.tell()
+    else:
+        temporal = get_temporal(file_out)
+        try:
+            timed('save', image_out.save, temporal)
+            replace_file(temporal, file_out)
+        except Exception:
+            os.remove(temporal)
+            raise
+        size = None
+    if 'outputs' in JOB_STATS:
+        JOB_STATS['outputs'].append(file_out)
+    if 'enabled' in JOB_STATS:
+        if size is None:
+            size = os.path.getsize(file_out)
+        JOB_STATS['bytes_out'] = JOB_STATS.get('bytes_out', 0) + size
+
+
+def save_image(image_out, file_in, overwrite, suffix):
+    if overwrite:
+        write_image(image_out, file_in)
+    else:
+        basename, extension = os.path.splitext(file_in)
+        write_image(image_out, basename + suffix + extension)
+
+
+def get_watermark(file_watermark, scale=1.0):
+    # The decoded watermark is shared by every image of a batch in a worker
+    # and by every preview update of the dialog
+    scale = round(scale, 2)
+    key = (file_watermark, os.path.getmtime(file_watermark), scale)
+    if key in WATERMARKS:
+        return WATERMARKS[key]
+    image_watermark = Image.open(file_watermark)
+    if scale != 1.0:
+        # previews work on a reduced copy of the image
+        width_watermark, height_watermark = image_watermark.size
+        image_watermark = image_watermark.resize(
+            (max(1, int(width_watermark * scale)),
+             max(1, int(height_watermark * scale))), Image.ANTIALIAS)
+    try:
+        image_watermark = image_watermark.convert('RGBA')
+    except Exception as e:
+        print(e)
+    image_watermark.load()
+    WATERMARKS[key] = image_watermark
+    if len(WATERMARKS) > WATERMARKS_SIZE:
+        WATERMARKS.popitem(last=False)
+    return image_watermark
+
+
+def watermark(image_in, file_watermark, horizontal_position,
+              vertical_position, scale=1.0, inplace=False):
+    image_watermark = get_watermark(file_watermark, scale)
+    width_original, height_original = image_in.size
+    width_watermark, height_watermark = image_watermark.size
+    if width_original < width_watermark:
+        width = width_watermark
+    else:
+        width = width_original
+    if height_original < height_watermark:
+        height = height_watermark
+    else:
+        height = height_original
+    if image_in.size == (width, height) and \
+            image_in.mode in ('RGB', 'RGBA'):
+        # the watermark fits, so the image keeps its mode, and inplace
+        # pastes it without a copy
+        if inplace:
+            image_out = image_in
+        else:
+            image_out = image_in.copy()
+    else:
+        image_out = Image.new('RGBA', (width, height))
+        image_out.paste(image_in, (int((width - width_original) / 2),
+                        int((height - height_original) / 2)))
+    if horizontal_position == 0:
+        watermark_left = 0
+    elif horizontal_position == 1:
+        watermark_left = int((width - width_watermark) / 2)
+    else:
+        watermark_left = int(width - width_watermark)
+    if vertical_position == 0:
+        watermark_top = 0
+    elif vertical_position == 1:
+        watermark_top = int((height - height_watermark) / 2)
+    else:
+        watermark_top = int(height - height_watermark)
+    image_out.paste(image_watermark,
+                    (watermark_left, watermark_top), mask=image_watermark)
+    return image_out
+
+
+def watermark_image(file_in, overwrite, file_watermark, horizontal_position,
+                    vertical_position):
+    image_in = open_image(file_in)
+    image_out = watermark(image_in, file_watermark, horizontal_position,
+                          vertical_position,
+                          inplace=get_memory_size(image_in) > MEMORY_CEILING)
+    save_image(image_out, file_in, overwrite, '_wartermark')
+
+
+def filter_image(file_in, overwrite, afilter, filter_extension):
+    image_in = open_image(file_in)
+    image_out = transform_in_strips(
+        image_in, lambda region: region.filter(afilter), FILTER_MARGIN)
+    save_image(image_out, file_in, overwrite, '_' + filter_extension)
+
+
+def shadow(image_in, iterations=8, border=-1, offset=(20, 20),
+           backgroundColour='white', shadowColour='#444444', alpha=True):
+    if border < 0:
+        width, height = image_in.size
+        if width > height:
+            border = int(0.02 * width)
+        else:
+            border = int(0.02 * height)
+    offset = (int(border / 2), int(border / 2))
+    return makeShadow(image_in, iterations, border, offset,
+                      backgroundColour, shadowColour, alpha)
+
+
+def shadow_image(file_in, overwrite=False, iterations=8, border=-1,
+                 offset=(20, 20), backgroundColour='white',
+                 shadowColour='#444444'):
+    alpha = os.path.splitext(file_in)[1].lower() not in OPAQUE_EXTENSIONS
+    image_out = shadow(open_image(file_in), iterations, border, offset,
+                       backgroundColour, shadowColour, alpha)
+    save_image(image_out, file_in, overwrite, '_with_shadow')
+
+
+def blur_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.BLUR, 'blur')
+
+
+def contour_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.CONTOUR, 'contour')
+
+
+def detail_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.DETAIL, 'detail')
+
+
+def edge_enhance_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.EDGE_ENHANCE, 'edge_enhance')
+
+
+def edge_enhance_more_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.EDGE_ENHANCE_MORE,
+                 'edge_enhance_more')
+
+
+def emboss_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.EMBOSS, 'emboss')
+
+
+def find_edges_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.FIND_EDGES, 'find_edges')
+
+
+def smooth_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.SMOOTH, 'smooth')
+
+
+def smooth_more_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.SMOOTH_MORE, 'smooth_more')
+
+
+def sharpen_image(file_in, overwrite=False):
+    filter_image(file_in, overwrite, ImageFilter.SHARPEN, 'sharpen')
+
+
+def enhance(image_in, brightness=100, color=100, contrast=100,
+            sharpness=100):
+    if int(brightness) != 100:
+        enhancer = ImageEnhance.Brightness(image_in)
+        image_in = enhancer.enhance(float(brightness / 100.0))
+    if int(color) != 100:
+        enhancer = ImageEnhance.Color(image_in)
+        image_in = enhancer.enhance(float(color / 100.0))
+    if int(contrast) != 100:
+        enhancer = ImageEnhance.Contrast(image_in)
+        image_in = enhancer.enhance(float(contrast / 100.0))
+    if int(sharpness) != 100:
+        enhancer = ImageEnhance.Sharpness(image_in)
+        image_in = enhancer.enhance(float(sharpness / 100.0))
+    return image_in
+
+
+def enhance_image(file_in, overwrite=False, brightness=100, color=100,
+                  contrast=100, sharpness=100):
+    image_out = transform_in_strips(
+        open_image(file_in),
+        lambda region: enhance(region, brightness, color, contrast,
+                               sharpness),
+        get_strip_margin('enhance', (brightness, color, contrast, sharpness)))
+    save_image(image_out, file_in, overwrite, '_enhance')
+
+
+def resize(image_in, maintain_aspect_ratio=False, percentage_width=True,
+           percentage_height=True, new_width=50, new_height=50,
+           quality=RESIZE_BALANCED):
+    width, height = image_in.size
+    if percentage_width:
+        new_width = int(width * new_width / 100)
+    else:
+        new_width = int(new_width)
+    if maintain_aspect_ratio:
+        new_height = height * new_width / width
+    else:
+        if percentage_height:
+            new_height = int(height * new_height / 100)
+        else:
+            new_height = int(new_height)
+    # JPEG files can be decoded at 1/2, 1/4 or 1/8 of their size directly
+    # from the DCT coefficients. This only works before the image is
+    # loaded and does nothing for other formats
+    if quality == RESIZE_FAST:
+        image_in.draft(image_in.mode, (new_width, new_height))
+    elif quality == RESIZE_BALANCED:
+        image_in.draft(image_in.mode, (2 * new_width, 2 * new_height))
+    return image_in.resize((new_width, new_height), Image.ANTIALIAS)
+
+
+def resize_image(file_in, overwrite=False, maintain_aspect_ratio=False,
+                 percentage_width=True, percentage_height=True,
+                 new_width=50, new_height=50, quality=RESIZE_BALANCED):
+    image_out = resize(open_image(file_in), maintain_aspect_ratio,
+                       percentage_width, percentage_height, new_width,
+                       new_height, quality)
+    save_image(image_out, file_in, overwrite, '_resize')
+
+
+def black_white(image_in):
+    return image_in.convert('1')
+
+
+def black_white_image(file_in, overwrite=False):
+    image_out = black_white(open_image(file_in))
+    save_image(image_out, file_in, overwrite, '_black_and_White')
+
+
+def greyscale(image_in):
+    return image_in.convert('LA')
+
+
+def greyscale_image(file_in, overwrite=False):
+    image_out = greyscale(open_image(file_in))
+    try:
+        save_image(image_out, file_in, overwrite, '_greyscale')
+    except Exception as e:
+        print(e)
+
+
+def negative(image_in):
+    return ImageChops.invert(image_in)
+
+
+def negative_image(file_in, overwrite=False):
+    image_out = transform_in_strips(
+        open_image(file_in), negative, get_strip_margin('negative', ()))
+    save_image(image_out, file_in, overwrite, '_negative')
+
+
+def date_image(file_in, overwrite=False):
+    # the file is decoded only once: EXIF comes from the same handle
+    image_in = open_image(file_in)
+    date = get_date(image_in, file_in)
+    image_in = write_date(image_in, date)
+    save_image(image_in, file_in, overwrite, '_with_date')
+
+
+def border(image_in, border_width=-1, fill='white'):
+    if border_width < 0:
+        width, height = image_in.size
+        if width > height:
+            border_width = int(0.02 * width)
+        else:
+            border_width = int(0.02 * height)
+    return ImageOps.expand(image_in, border_width, fill)
+
+
+def border_image(file_in, overwrite=False, border_width=-1, fill='white'):
+    image_out = border(open_image(file_in), border_width, fill)
+    save_image(image_out, file_in, overwrite, '_with_border')
+
+
+def vintage(image_in, noise_level=20, seed=None):
+    if image_in.mode != 'RGB':
+        image_in = image_in.convert('RGB')
+    image_in = vintage_colors(image_in)
+    return add_noise(image_in, noise_level, seed)
+
+
+def vintage_image(file_in, overwrite=False, noise_level=20, seed=None):
+    image_in = open_image(file_in)
+    if image_in.mode != 'RGB':
+        image_in = image_in.convert('RGB')
+    # strips share the generator, so the noise does not repeat
+    generator = random.Random(seed)
+    image_out = transform_in_strips(
+        image_in, lambda region: vintage(region, noise_level, generator),
+        get_strip_margin('vintage', (noise_level, seed)))
+    save_image(image_out, file_in, overwrite, '_vintage')
+
+
+def jpegtran_image(file_in, overwrite, suffix, options):
+    # Transforms a JPEG file without decoding it, moving whole MCU blocks
+    # of DCT coefficients. Returns False when it can not be done, so that
+    # the caller falls back to decoding and encoding the image
+    if JPEGTRAN is None or open_image(file_in).format != 'JPEG':
+        return False
+    basename, extension = os.path.splitext(file_in)
+    if overwrite:
+        file_out = file_in
+    else:
+        file_out = basename + suffix + extension
+    temporal = get_temporal(file_out)
+    # -perfect fails instead of dropping the partial blocks at the edges
+    # when the image size is not a multiple of the MCU size. EXIF is not
+    # copied, as its orientation and thumbnail would not match the moved
+    # pixels, and the decoding fallback does not keep it either
+    command = [JPEGTRAN, '-copy', 'comments', '-perfect'] + options + \
+        ['-outfile', temporal, file_in]
+    if subprocess.call(command) != 0:
+        os.remove(temporal)
+        return False
+    replace_file(temporal, file_out)
+    if 'outputs' in JOB_STATS:
+        JOB_STATS['outputs'].append(file_out)
+    if 'enabled' in JOB_STATS:
+        JOB_STATS['bytes_out'] = JOB_STATS.get('bytes_out', 0) + \
+            os.path.getsize(file_out)
+    return True
+
+
+def rotate(image_in, degrees=90):
+    degrees = degrees % 360
+    if degrees in TRANSPOSE_ROTATIONS:
+        return image_in.transpose(TRANSPOSE_ROTATIONS[degrees])
+    return image_in.rotate(degrees, Image.BICUBIC, True)
+
+
+def rotate_image(file_in, overwrite=True, degrees=90):
+    degrees = degrees % 360
+    if degrees in JPEGTRAN_ROTATIONS and jpegtran_image(
+            file_in, overwrite, '_rotated',
+            ['-rotate', JPEGTRAN_ROTATIONS[degrees]]):
+        return
+    image_out = rotate(open_image(file_in), degrees)
+    save_image(image_out, file_in, overwrite, '_rotated')
+
+
+def convert_image(file_in, new_extension):
+    image_in = open_image(file_in)
+    basename, old_extension = os.path.splitext(file_in)
+    if not new_extension.startswith('.'):
+        new_extension = '.' + new_extension
+    write_image(image_in, basename + new_extension)
+
+
+def flip(image_in, horizontal=True):
+    if horizontal:
+        return image_in.transpose(Image.FLIP_LEFT_RIGHT)
+    return image_in.transpose(Image.FLIP_TOP_BOTTOM)
+
+
+def flip_image(file_in, overwrite=True, horizontal=True):
+    if horizontal:
+        options = ['-flip', 'horizontal']
+    else:
+        options = ['-flip', 'vertical']
+    if jpegtran_image(file_in, overwrite, '_flipped', options):
+        return
+    image_out = flip(open_image(file_in), horizontal)
+    save_image(image_out, file_in, overwrite, '_flipped')
+
+
+FILTERS = {
+    'blur': ImageFilter.BLUR,
+    'contour': ImageFilter.CONTOUR,
+    'detail': ImageFilter.DETAIL,
+    'edge_enhance': ImageFilter.EDGE_ENHANCE,
+    'edge_enhance_more': ImageFilter.EDGE_ENHANCE_MORE,
+    'emboss': ImageFilter.EMBOSS,
+    'find_edges': ImageFilter.FIND_EDGES,
+    'smooth': ImageFilter.SMOOTH,
+    'smooth_more': ImageFilter.SMOOTH_MORE,
+    'sharpen': ImageFilter.SHARPEN,
+    }
+
+# Operations that can be chained in a recipe. Each one takes an image and
+# its own parameters and returns the transformed image
+OPERATIONS = {
+    'black_and_white': black_white,
+    'border': border,
+    'enhance': enhance,
+    'flip': flip,
+    'greyscale': greyscale,
+    'negative': negative,
+    'resize': resize,
+    'rotate': rotate,
+    'shadow': shadow,
+    'vintage': vintage,
+    'watermark': watermark,
+    }
+
+
+def apply_step(image_in, name, args):
+    if name in FILTERS:
+        return image_in.filter(FILTERS[name])
+    return OPERATIONS[name](image_in, *args)
+
+
+def get_strip_margin(name, args):
+    # Rows of context a step needs around a strip, or None when it needs
+    # the whole image
+    if name in FILTERS:
+        return FILTER_MARGIN
+    if name in ('negative', 'vintage'):
+        return 0
+    if name == 'enhance' and (len(args) < 3 or int(args[2]) == 100):
+        # contrast depends on the mean of the whole image, but brightness,
+        # color and sharpness do not
+        return FILTER_MARGIN
+    return None
+
+
+def recipe_image(file_in, overwrite=False, steps=()):
+    # every step is applied in memory, so the file is decoded and encoded
+    # only once whatever the number of steps
+    image_out = open_image(file_in)
+    for name, args in steps:
+        margin = get_strip_margin(name, args)
+        if name == 'vintage' and margin is not None:
+            # like vintage_image, the strips share the mode and the noise
+            if image_out.mode != 'RGB':
+                image_out = image_out.convert('RGB')
+            args = (args[0] if len(args) > 0 else 20,
+                    random.Random(args[1] if len(args) > 1 else None))
+        if margin is None:
+            image_out = apply_step(image_out, name, args)
+        else:
+            image_out = transform_in_strips(
+                image_out, lambda region: apply_step(region, name, args),
+                margin)
+    save_image(image_out, file_in, overwrite, '_recipe')
@@ -0,0 +1,216 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+#
+# This file is part of Image-Tools
+#
+# Copyright (C) 2013-2016
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Reading what a batch needs to know of its files from their headers:
+# format, mode, size, EXIF orientation and whether the file is truncated or
+# corrupt. Only the formats in DECODED_FORMATS are decoded to tell it.
+# Nothing here needs Gtk
+
+import os
+import json
+from multiprocessing import Pool
+import time
+from PIL import Image
+from nautilus_image_tools import CACHE_DIR, _
+from nautilus_image_tools.batch import WORKERS
+from nautilus_image_tools.operations import get_temporal, replace_file
+
+# Headers already read, by path, valid while the file keeps its
+# modification time and size. The oldest are dropped over PROBE_INDEX_SIZE
+PROBE_INDEX = os.path.join(CACHE_DIR, 'probe.json')
+PROBE_INDEX_SIZE = 50000
+PROBE_VERSION = 2
+# Fewer files than this are probed in the calling process, as starting a
+# pool would take longer
+PROBE_SERIAL = 16
+PROBE_CHUNK = 32
+
+ORIENTATION = 0x0112
+# Formats whose headers do not tell whether the file is complete, so the
+# decoder is run on them. It stops at the end of the image, whatever
+# follows it, like the video of a motion photo. JPEGs are decoded at 1/8
+# of their size, as it is several times faster
+DECODED_FORMATS = ('JPEG', 'MPO', 'GIF')
+# modes of a byte per band, whose raw rows are width * bands bytes
+BYTE_MODES = ('L', 'P', 'RGB', 'RGBA', 'CMYK', 'LA')
+
+
+def get_orientation(image):
+    # Only from the EXIF of the header, as some formats decode the image
+    # to look for it further on
+    if 'exif' not in image.info:
+        return 1
+    try:
+        exif = image._getexif()
+    except Exception:
+        return 1
+    if exif:
+        return exif.get(ORIENTATION, 1)
+    return 1
+
+
+def get_raw_size(image, box, args):
+    # bytes of the pixels of a raw tile, or 0 when they are not known
+    width, height = box[2] - box[0], box[3] - box[1]
+    stride = 0
+    if isinstance(args, tuple) and len(args) > 1:
+        stride = abs(args[1])
+    if stride == 0 and image.mode in BYTE_MODES:
+        stride = width * len(image.getbands())
+    return stride * height
+
+
+def is_truncated(image, size):
+    # the pixels of uncompressed files have to fit in the file
+    for decoder, box, offset, args in image.tile:
+        if decoder == 'raw' and offset + get_raw_size(image, box,
+                                                      args) > size:
+            return True
+    return False
+
+
+def probe_image(afile):
+    # Header of afile. error is None when the file can be processed
+    header = {'file': afile, 'mtime': None, 'size': None, 'format': None,
+              'mode': None, 'width': 0, 'height': 0, 'orientation': 1,
+              'error': None}
+    try:
+        stat = os.stat(afile)
+        header['mtime'] = stat.st_mtime
+        header['size'] = stat.st_size
+        image = Image.open(afile)
+        header['format'] = image.format
+        header['mode'] = image.mode
+        header['width'], header['height'] = image.size
+        header['orientation'] = get_orientation(image)
+        if is_truncated(image, stat.st_size):
+            header['error'] = _('the file is truncated')
+        elif image.format in DECODED_FORMATS:
+            # the decoder raises an IOError when the data ends too soon
+            image.draft(image.mode, (1, 1))
+            image.load()
+        else:
+            # checks what can be checked without decoding, like the CRC
+            # of the PNG chunks. The image can not be used after this
+            image.verify()
+    except Exception as e:
+        header['error'] = str(e) or e.__class__.__name__
+    return header
+
+
+class ProbeIndex(object):
+    # Headers of the files probed before, kept on disk between batches
+    def __init__(self, path=PROBE_INDEX):
+        self.path = path
+        self.headers = {}
+        self.changed = False
+        try:
+            with open(path) as fr:
+                index = json.load(fr)
+            if index.get('version') == PROBE_VERSION:
+                self.headers = index['headers']
+        except (IOError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, afile):
+        # the header of afile when it has not changed since it was probed
+        header = self.headers.get(afile)
+        if header is None:
+            return None
+        try:
+            stat = os.stat(afile)
+        except OSError:
+            return None
+        if header['mtime'] != stat.st_mtime or header['size'] != stat.st_size:
+            return None
+        return header
+
+    def add(self, header):
+        if header['mtime'] is not None:
+            header['probed'] = time.time()
+            self.headers[header['file']] = header
+            self.changed = True
+
+    def iter_probe(self, files, workers=WORKERS):
+        # Yields the header of every file, in order. The files not in the
+        # index are read by a pool of processes, ahead of the ones yielded
+        known = dict((afile, self.get(afile)) for afile in files)
+        missing = [afile for afile in files if known[afile] is None]
+        pool = None
+        if len(missing) == 0:
+            probed = iter([])
+        elif workers < 2 or len(missing) < PROBE_SERIAL:
+            probed = (probe_image(afile) for afile in missing)
+        else:
+            pool = Pool(min(workers, len(missing) / PROBE_CHUNK + 1))
+            probed = pool.imap(probe_image, missing, PROBE_CHUNK)
+        try:
+            missing = set(missing)
+            for afile in files:
+                if afile in missing:
+                    header = next(probed)
+                    self.add(header)
+                else:
+                    header = known[afile]
+                yield header
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def probe(self, files, workers=WORKERS):
+        return list(self.iter_probe(files, workers))
+
+    def save(self):
+        if not self.changed:
+            return
+        if len(self.headers) > PROBE_INDEX_SIZE:
+            newest = sorted(self.headers.values(),
+                            key=lambda header: header['probed'])
+            self.headers = dict((header['file'], header) for header in
+                                newest[-PROBE_INDEX_SIZE:])
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        temporal = get_temporal(self.path)
+        try:
+            with open(temporal, 'w') as fw:
+                json.dump({'version': PROBE_VERSION,
+                           'headers': self.headers}, fw)
+            replace_file(temporal, self.path)
+        except Exception:
+            os.remove(temporal)
+            raise
+        self.changed = False
+
+
+def probe_files(files, workers=WORKERS, path=PROBE_INDEX):
+    # Headers of files, through the index in path
+    index = ProbeIndex(path)
+    try:
+        return index.probe(files, workers)
+    finally:
+        index.save()
+
+
+def format_bad_files(headers):
+    return '\n'.join('%s: %s' % (header['file'], header['error'])
+                     for header in headers if header['error'] is not None)